@@ -0,0 +1,187 @@
+# benchmarks/cliente_falso.py
+
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from functions.busca import normalizar_texto
+from functions.fc_dash_vendas import COLUNA_LOTE, COLUNAS_LISTA_TRANSACOES, LIMITE_DIAS_GESTAO, colunas_da_view
+from functions.rollup import DIMENSOES_ITENS, DIMENSOES_PEDIDOS, DIMENSOES_TRANSACOES, SOMAS_PEDIDOS
+
+# Colunas NUMERIC no BigQuery: chegam ao dashboard como decimal, e não como float
+COLUNAS_NUMERIC = {"amount", "value", "value_paid", "value_pending", "total_split", "total_amount",
+                   "value_discount"}
+
+
+def _para_arrow(df, decimais=COLUNAS_NUMERIC):
+    """Tabela Arrow com os tipos que o BigQuery devolveria (NUMERIC como decimal, DATE como date32)."""
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    for i, campo in enumerate(tabela.schema):
+        if campo.name in decimais:
+            tabela = tabela.set_column(i, campo.name, pc.cast(tabela.column(i), pa.decimal128(18, 2), safe=False))
+        elif campo.name in ("dia", "dia_pedido"):
+            tabela = tabela.set_column(i, campo.name, pc.cast(tabela.column(i), pa.date32()))
+    return tabela
+
+
+class LinhasFalsas:
+    """Equivalente ao RowIterator do resultado de um job."""
+
+    def __init__(self, tabela):
+        self._tabela = tabela
+        self.total_rows = tabela.num_rows
+
+    def to_arrow(self, bqstorage_client=None, create_bqstorage_client=True):
+        return self._tabela
+
+
+class JobFalso:
+    """Equivalente ao QueryJob: resultado já calculado, com os bytes "processados" estimados."""
+
+    def __init__(self, tabela, bytes_processados):
+        self.job_id = f"benchmark-{uuid.uuid4().hex[:12]}"
+        self.total_bytes_processed = bytes_processados
+        self.cache_hit = False
+        self._linhas = LinhasFalsas(tabela)
+
+    def result(self):
+        return self._linhas
+
+
+class ClienteFalso:
+    """Substituto local do bigquery.Client para os benchmarks (ver fc_dash_vendas.definir_cliente).
+
+    Responde às consultas de fc_dash_vendas a partir dos DataFrames de
+    `dados_sinteticos.gerar_dados`, identificando cada uma pelo rótulo `consulta`
+    do job, e aplica em pandas os mesmos filtros, agrupamentos e ordenações do SQL.
+    O tempo gasto aqui fica em `tempo_consultas`, para ser descontado das medições.
+    """
+
+    def __init__(self, dados):
+        self.dados = dados
+        self.tempo_consultas = 0.0
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._respostas = {
+            "transacoes": self._transacoes,
+            "rollup_pedidos": self._rollup_pedidos,
+            "rollup_itens_pedidos": self._rollup_itens_pedidos,
+            "rollup_transacoes": self._rollup_transacoes,
+            "contagem_transacoes": self._contagem_transacoes,
+            "pagina_transacoes": self._pagina_transacoes,
+        }
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.tempo_consultas = 0.0
+            self.jobs = {}
+
+    def query(self, query, job_config=None):
+        inicio = time.perf_counter()
+        consulta = (job_config.labels or {}).get("consulta")
+        if consulta not in self._respostas:
+            raise NotImplementedError(f"Consulta sem resposta no cliente falso: {consulta!r}")
+        # Parâmetros escalares têm `value`; o de lista (people_ids, nas consultas em lote), `values`
+        parametros = {p.name: p.values if hasattr(p, "values") else p.value for p in job_config.query_parameters}
+        df, bytes_processados = self._respostas[consulta](parametros)
+        # Os rollups somam com SAFE_CAST(... AS FLOAT64): as somas chegam como float
+        decimais = set() if consulta.startswith("rollup_") else COLUNAS_NUMERIC
+        job = JobFalso(_para_arrow(df, decimais), bytes_processados)
+        with self._lock:
+            self.tempo_consultas += time.perf_counter() - inicio
+            self.jobs[consulta] = self.jobs.get(consulta, 0) + 1
+        return job
+
+    # --- RESPOSTAS ÀS CONSULTAS ---
+
+    def _periodo(self, view, parametros, coluna_people="people_id_conciliation"):
+        """Linhas do people_id (ou dos people_ids do lote, com a COLUNA_LOTE) no período.
+
+        As views estão ordenadas por data.
+        """
+        df = self.dados[view]
+        datas = df["created_at_gmt_minus_3"].to_numpy()
+        inicio = np.searchsorted(datas, pd.Timestamp(parametros["start_date"]).to_datetime64(), side="left")
+        fim = np.searchsorted(datas, pd.Timestamp(parametros["end_date"]).to_datetime64(), side="right")
+        fatia = df.iloc[inicio:fim]
+        if "people_ids" in parametros:
+            fatia = fatia[fatia[coluna_people].isin(parametros["people_ids"])]
+            fatia = fatia.assign(**{COLUNA_LOTE: fatia[coluna_people]})
+        else:
+            fatia = fatia[fatia[coluna_people] == parametros["people_id"]]
+        return fatia, int(fatia.memory_usage(index=False).sum())
+
+    @staticmethod
+    def _com_lote(df, colunas):
+        return colunas + [COLUNA_LOTE] if COLUNA_LOTE in df.columns else colunas
+
+    def _transacoes_principais(self, parametros):
+        df, bytes_processados = self._periodo("vw_transactions_split", parametros)
+        df = df[df["seller_principal"] == "S"]
+        filtro = parametros.get("filtro")
+        if filtro:
+            # O SQL compara o nome sem acentos e em minúsculas; o filtro já chega assim
+            nomes = df["product_name"].map(normalizar_texto, na_action="ignore")
+            df = df[nomes.str.contains(filtro, regex=False, na=False)]
+        return df, bytes_processados
+
+    def _transacoes(self, parametros):
+        df, bytes_processados = self._transacoes_principais(parametros)
+        return df[self._com_lote(df, colunas_da_view("vw_transactions_split"))], bytes_processados
+
+    @classmethod
+    def _rollup(cls, df, dimensoes, coluna_valor, somas=()):
+        dia = df["created_at_gmt_minus_3"].dt.normalize().rename("dia")
+        agrupado = df.groupby([dia, *[df[d] for d in cls._com_lote(df, dimensoes)]], observed=True)
+        resultado = agrupado[coluna_valor].agg(quantidade="size", valor="sum")
+        if somas:
+            resultado = resultado.join(agrupado[list(somas)].sum())
+        return resultado.reset_index()
+
+    def _rollup_pedidos(self, parametros):
+        df, bytes_processados = self._periodo("vw_order", parametros)
+        return self._rollup(df, DIMENSOES_PEDIDOS, "total_amount", SOMAS_PEDIDOS), bytes_processados
+
+    def _rollup_itens_pedidos(self, parametros):
+        itens, bytes_processados = self._periodo("vw_order_itens", parametros, coluna_people="responsible_id")
+        janela = pd.Timedelta(days=LIMITE_DIAS_GESTAO)
+        inicio = (pd.Timestamp(parametros["start_date"]) - janela).to_datetime64()
+        fim = (pd.Timestamp(parametros["end_date"]) + janela).to_datetime64()
+        pedidos = self.dados["vw_order"]
+        datas = pedidos["created_at_gmt_minus_3"]
+        pedidos = pedidos[(pedidos["status"] == "PGCON") & (datas >= inicio) & (datas <= fim)]
+        df = itens.merge(pedidos[["document_id", "created_at_gmt_minus_3", "people_id_conciliation"]].rename(
+            columns={"created_at_gmt_minus_3": "dia_pedido"}), on="document_id")
+        # O pedido é do mesmo people_id do item (o responsible_id)
+        df = df[df["people_id_conciliation"] == df["responsible_id"]]
+        df = df.merge(self.dados["vw_peoples"], on="people_id", how="left")
+        df["dia_pedido"] = df["dia_pedido"].dt.normalize()
+        return self._rollup(df, DIMENSOES_ITENS, "value_discount"), bytes_processados
+
+    def _rollup_transacoes(self, parametros):
+        df, bytes_processados = self._periodo("vw_transactions_split", parametros)
+        return self._rollup(df, DIMENSOES_TRANSACOES, "amount"), bytes_processados
+
+    def _contagem_transacoes(self, parametros):
+        df, bytes_processados = self._transacoes_principais(parametros)
+        return pd.DataFrame({"quantidade": [len(df)]}), bytes_processados
+
+    def _pagina_transacoes(self, parametros):
+        df, bytes_processados = self._transacoes_principais(parametros)
+        if parametros.get("cursor_data") is not None:
+            # O QueryJobConfig devolve o TIMESTAMP em UTC; a coluna, como o dashboard a lê, não tem fuso
+            cursor_data = pd.Timestamp(parametros["cursor_data"])
+            if cursor_data.tz is not None:
+                cursor_data = cursor_data.tz_convert(None)
+            datas = df["created_at_gmt_minus_3"]
+            df = df[(datas < cursor_data)
+                    | ((datas == cursor_data) & (df["transaction_id"].astype(str) < parametros["cursor_id"]))]
+        # ORDER BY created_at_gmt_minus_3 DESC, CAST(transaction_id AS STRING) DESC
+        df = df.sort_values(["created_at_gmt_minus_3", "transaction_id"], ascending=False,
+                            key=lambda coluna: coluna.astype(str) if coluna.name == "transaction_id" else coluna)
+        return df.head(parametros["tamanho"])[COLUNAS_LISTA_TRANSACOES], bytes_processados
@@ -0,0 +1,99 @@
+# benchmarks/dados_sinteticos.py
+
+import numpy as np
+import pandas as pd
+
+# Valores dos campos categóricos, nas proporções aproximadas de um estabelecimento real
+STATUS_TRANSACAO = (["Aprovada", "Cancelada", "Estornada", "Chargeback"], [0.86, 0.07, 0.05, 0.02])
+STATUS_PEDIDO = (["PGCON", "PGPAG", "PEND", "CANC"], [0.70, 0.10, 0.15, 0.05])
+FORMAS_CAPTURA = ([f"Crédito {n}x" for n in range(1, 13)] + ["Débito", "Pix"],
+                  [0.30] + [0.02] * 11 + [0.25, 0.23])
+MODOS_ENTRADA = (["chip", "contactless", "qrcode", "outros"], [0.40, 0.30, 0.15, 0.15])
+
+PRIMEIROS_NOMES = ["Ana", "João", "José", "Márcia", "Luís", "Beatriz", "Conceição", "André", "Fátima", "Sérgio",
+                   "Cláudia", "Antônio", "Júlia", "Mônica", "Rogério", "Patrícia", "Vinícius", "Letícia"]
+SOBRENOMES = ["Silva", "Souza", "Conceição", "Araújo", "Gonçalves", "Pereira", "Lima", "Ferreira", "Gomes",
+              "Ribeiro", "Simões", "Magalhães", "Brandão", "Assunção", "Nogueira", "Barbosa"]
+PRODUTOS = ["Corte feminino", "Corte masculino", "Escova", "Coloração", "Manicure", "Pedicure", "Hidratação",
+            "Design de sobrancelha", "Massagem relaxante", "Limpeza de pele", "Depilação", "Maquiagem",
+            "Progressiva", "Luzes", "Barba", "Spa dos pés", "Penteado", "Alongamento de unhas"]
+
+
+def _escolher(rng, opcoes, quantidade):
+    valores, pesos = opcoes
+    return np.array(valores, dtype=object)[rng.choice(len(valores), size=quantidade, p=pesos)]
+
+
+def _datas(rng, quantidade, inicio, fim):
+    """Datas-hora uniformes no período, em ordem crescente (como a partição por data no BigQuery)."""
+    inicio = pd.Timestamp(inicio).value // 1000
+    fim = pd.Timestamp(fim).value // 1000
+    return pd.to_datetime(np.sort(rng.integers(inicio, fim, size=quantidade)), unit='us')
+
+
+def _valores(rng, quantidade, media):
+    return np.round(rng.gamma(2.0, media / 2.0, size=quantidade), 2)
+
+
+def gerar_dados(linhas, inicio, fim, people_id="benchmark", profissionais=25, clientes=5_000, semente=42):
+    """Dados de um people_id no período, com `linhas` linhas em cada view.
+
+    Retorna um dicionário view -> DataFrame com as colunas que as consultas do
+    dashboard leem de vw_order, vw_order_itens, vw_transactions_split e vw_peoples.
+    Com a mesma semente, os dados gerados são sempre os mesmos.
+    """
+    rng = np.random.default_rng(semente)
+
+    nomes_clientes = np.array([f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+                               for _ in range(clientes)], dtype=object)
+    documentos_clientes = np.array([f"{n:011d}" for n in rng.integers(10 ** 10, 10 ** 11, size=clientes)],
+                                   dtype=object)
+    cliente = rng.integers(0, clientes, size=linhas)
+    transacoes = pd.DataFrame({
+        "transaction_id": np.char.add("T", np.arange(linhas).astype(str)).astype(object),
+        "created_at_gmt_minus_3": _datas(rng, linhas, inicio, fim),
+        "status": _escolher(rng, STATUS_TRANSACAO, linhas),
+        "amount": _valores(rng, linhas, 150.0),
+        "product_capture": _escolher(rng, FORMAS_CAPTURA, linhas),
+        "product_name": nomes_clientes[cliente],
+        "customer_document": documentos_clientes[cliente],
+        "entry_mode": _escolher(rng, MODOS_ENTRADA, linhas),
+        "seller_principal": np.where(rng.random(linhas) < 0.9, "S", "N").astype(object),
+        "people_id_conciliation": people_id,
+    })
+
+    valor_pedido = _valores(rng, linhas, 200.0)
+    status_pedido = _escolher(rng, STATUS_PEDIDO, linhas)
+    pago = np.where(status_pedido == "PGCON", valor_pedido,
+                    np.where(status_pedido == "PGPAG", np.round(valor_pedido * rng.random(linhas), 2), 0.0))
+    pedidos = pd.DataFrame({
+        "document_id": np.char.add("P", np.arange(linhas).astype(str)).astype(object),
+        "created_at_gmt_minus_3": _datas(rng, linhas, inicio, fim),
+        "status": status_pedido,
+        "value": valor_pedido,
+        "value_paid": pago,
+        "value_pending": np.round(valor_pedido - pago, 2),
+        "total_split": np.round(pago * 0.4, 2),
+        "total_amount": valor_pedido,
+        "people_id_conciliation": people_id,
+    })
+
+    # Cada item aponta para um pedido existente e herda a data dele
+    pedido_do_item = np.sort(rng.integers(0, linhas, size=linhas))
+    ids_profissionais = np.array([f"{people_id}-prof-{n}" for n in range(profissionais)], dtype=object)
+    itens = pd.DataFrame({
+        "document_id": pedidos["document_id"].to_numpy()[pedido_do_item],
+        "created_at_gmt_minus_3": pedidos["created_at_gmt_minus_3"].to_numpy()[pedido_do_item],
+        "description": np.array(PRODUTOS, dtype=object)[rng.integers(0, len(PRODUTOS), size=linhas)],
+        "value_discount": _valores(rng, linhas, 120.0),
+        "responsible_id": people_id,
+        "people_id": ids_profissionais[rng.integers(0, profissionais, size=linhas)],
+    })
+
+    pessoas = pd.DataFrame({
+        "people_id": ids_profissionais,
+        "alias_name": [f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)}" for _ in range(profissionais)],
+    })
+
+    return {"vw_transactions_split": transacoes, "vw_order": pedidos, "vw_order_itens": itens,
+            "vw_peoples": pessoas}
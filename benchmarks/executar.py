@@ -0,0 +1,323 @@
+# benchmarks/executar.py
+"""Benchmarks do dashboard com dados sintéticos e um BigQuery falso, sem acesso à produção.
+
+Para cada tamanho (linhas por view), mede com o cache frio e quente:
+  - a preparação dos dados de cada aba (funções de fc_dash_vendas);
+  - a renderização de cada aba, executada pelo AppTest do Streamlit.
+Os resultados vão para um JSON; com --comparar, o script falha se alguma medição
+ficar mais lenta que a base além da tolerância.
+
+Uso, na raiz do projeto:
+    python -m benchmarks.executar
+    python -m benchmarks.executar --linhas 10000 100000 --repeticoes 5
+    python -m benchmarks.executar --saida atual.json --comparar benchmarks/base.json --tolerancia 0.25
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.cliente_falso import ClienteFalso
+from benchmarks.dados_sinteticos import gerar_dados
+from functions import metricas
+from functions.fc_dash_vendas import cache_consultas, cache_segmentos, contagem_transacoes, dados_dashboard_principal, \
+    cursor_da_pagina, dados_gestao_pedidos, dados_kpi, definir_cliente, lista_transacoes_em_memoria, \
+    pagina_transacoes
+from tabs.utils import gerar_grid_html
+from tabs.vendas import LIMITE_LISTA_EM_MEMORIA
+
+PEOPLE_ID = "benchmark"
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+TIMEOUT_RENDER = 600
+# Diferenças absolutas menores que isso (em segundos) nunca contam como regressão
+FOLGA_COMPARACAO = 0.05
+
+
+# --- SCRIPTS DAS ABAS PARA O APPTEST ---
+# O AppTest executa o código-fonte destas funções como um script do Streamlit,
+# no mesmo processo: o cliente falso definido abaixo vale também para elas.
+
+def _app_vendas(people_id):
+    from tabs import vendas
+    vendas.render(people_id)
+
+
+def _app_gestao_pedidos(people_id):
+    from tabs import gestao_pedidos
+    gestao_pedidos.render(people_id)
+
+
+def _app_kpi(people_id, gmv_metas, tpv_metas):
+    from tabs import kpi
+    kpi.render(people_id, gmv_metas, tpv_metas)
+
+
+def _periodo():
+    """Mês atual até agora: o período padrão das abas Vendas e Gestão de Pedidos."""
+    agora = datetime.now()
+    inicio = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return inicio, agora
+
+
+def _limpar_caches():
+    cache_segmentos.limpar(PEOPLE_ID)
+    cache_consultas.limpar()
+
+
+def _cronometrar(funcao, cliente):
+    cliente.zerar_contadores()
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio, cliente.tempo_consultas
+
+
+def _medir(funcao, cliente, repeticoes):
+    """Mede `funcao` com o cache frio e, em seguida, quente; devolve as medianas de cada caso."""
+    amostras = {"frio": [], "quente": []}
+    for _ in range(repeticoes):
+        _limpar_caches()
+        amostras["frio"].append(_cronometrar(funcao, cliente))
+        amostras["quente"].append(_cronometrar(funcao, cliente))
+    return {cache: {"segundos": statistics.median(t for t, _ in valores),
+                    "segundos_cliente_falso": statistics.median(f for _, f in valores),
+                    "amostras": [round(t, 4) for t, _ in valores]}
+            for cache, valores in amostras.items()}
+
+
+def _renderizar(app):
+    app.run(timeout=TIMEOUT_RENDER)
+    if app.exception:
+        raise RuntimeError(f"Exceção ao renderizar: {app.exception[0].message}")
+    if app.error:
+        raise RuntimeError(f"Erro exibido pela aba: {app.error[0].value}")
+
+
+def _etapas_preparacao(linhas, inicio, fim):
+    inicio_str, fim_str = inicio.strftime('%Y-%m-%d %H:%M:%S'), fim.strftime('%Y-%m-%d 23:59:59')
+
+    # A lista de Vendas segue o mesmo caminho da aba: índice em memória ou página no BigQuery
+    if linhas <= LIMITE_LISTA_EM_MEMORIA:
+        def lista():
+            lista_transacoes_em_memoria(PEOPLE_ID, inicio_str, fim_str)
+    else:
+        def lista():
+            contagem_transacoes(PEOPLE_ID, inicio_str, fim_str)
+            pagina_transacoes(PEOPLE_ID, inicio_str, fim_str)
+
+    return {
+        "vendas": lambda: dados_dashboard_principal(PEOPLE_ID, inicio_str, fim_str),
+        "vendas_lista": lista,
+        "gestao_pedidos": lambda: dados_gestao_pedidos(PEOPLE_ID, inicio_str, fim_str),
+        "kpi": lambda: dados_kpi(PEOPLE_ID, str(inicio.year)),
+    }
+
+
+def verificar_paginacao(inicio, fim, paginas=2, tamanho=20):
+    """Confere que as primeiras páginas do BigQuery (keyset) repetem o início da lista em memória.
+
+    Os dois caminhos da lista de Vendas precisam mostrar as mesmas linhas na mesma
+    ordem; a partir da segunda página, o cursor também é exercitado.
+    """
+    inicio_str, fim_str = inicio.strftime('%Y-%m-%d %H:%M:%S'), fim.strftime('%Y-%m-%d 23:59:59')
+    df_lista, _ = lista_transacoes_em_memoria(PEOPLE_ID, inicio_str, fim_str)
+    cursor = None
+    ids_paginas = []
+    for _ in range(paginas):
+        pagina = pagina_transacoes(PEOPLE_ID, inicio_str, fim_str, cursor=cursor, tamanho=tamanho)
+        ids_paginas.extend(pagina["transaction_id"].astype(str))
+        cursor = cursor_da_pagina(pagina)
+    ids_lista = df_lista["transaction_id"].astype(str).head(paginas * tamanho).tolist()
+    if ids_paginas != ids_lista:
+        raise RuntimeError(f"As {paginas} primeiras páginas não coincidem com a lista em memória: "
+                           f"{ids_paginas[:5]}... x {ids_lista[:5]}...")
+
+
+def _gerar_grid_html_original(df_para_mostrar):
+    """gerar_grid_html como era antes de montar o HTML por coluna (linha a linha, com iterrows)."""
+    html_parts = [
+        '<div class="grid-container">',
+        '<div class="grid-row grid-header-row"><div>Data</div><div>ID da Transação</div><div>Cliente</div><div>Tipo</div><div class="valor">Valor</div></div>'
+    ]
+    for _, row in df_para_mostrar.iterrows():
+        try:
+            data_obj = pd.to_datetime(row.get('created_at_gmt_minus_3', ''))
+            data_str = data_obj.strftime('%d/%m/%Y')
+            hora_str = data_obj.strftime('%H:%M:%S')
+        except (ValueError, TypeError):
+            data_str, hora_str = "Data inválida", ""
+
+        id_str = str(row.get('transaction_id', 'N/A'))
+        status_str = str(row.get('status', 'N/A'))
+        status_class = f"status-{status_str.replace(' ', '')}"
+
+        cliente_nome = str(row.get('product_name', '')).strip().upper()
+        if not cliente_nome or cliente_nome == 'NONE':
+            cliente_nome = 'VENDA SEM PEDIDO'
+
+        cliente_doc = str(row.get('customer_document', ''))
+        tipo_str = str(row.get('product_capture', 'N/A'))
+        valor_str = f"R$ {row.get('amount', 0):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+        row_html = f"""
+            <div class="grid-row">
+                <div class="grid-col"><div>{data_str}</div><div style="font-size:0.8rem; color:#878787;">{hora_str}</div></div>
+                <div class="grid-col" style="font-family: monospace; font-size: 0.8rem; word-break: break-all;">{id_str}</div>
+                <div class="grid-col"><div class="status-text {status_class}">{status_str.upper()}</div><div class="client-name">{cliente_nome}</div><div class="client-cnpj">{cliente_doc}</div></div>
+                <div class="grid-col"><div>{tipo_str}</div></div>
+                <div class="grid-col valor">{valor_str}</div>
+            </div>
+        """
+        html_parts.append(row_html)
+
+    html_parts.append('</div>')
+    return "".join(html_parts)
+
+
+def verificar_grid_html(inicio, fim, linhas=500):
+    """Confere que gerar_grid_html produz exatamente o HTML da implementação original.
+
+    A comparação usa linhas sem valores nulos: para nulos, a versão atual mostra o
+    valor padrão da coluna, e a original, o texto do nulo ("<NA>", "nan").
+    """
+    inicio_str, fim_str = inicio.strftime('%Y-%m-%d %H:%M:%S'), fim.strftime('%Y-%m-%d 23:59:59')
+    df_lista, _ = lista_transacoes_em_memoria(PEOPLE_ID, inicio_str, fim_str)
+    df = df_lista.dropna().head(linhas)
+    for amostra in (df, df.iloc[0:0]):
+        if gerar_grid_html(amostra) != _gerar_grid_html_original(amostra):
+            raise RuntimeError(f"gerar_grid_html difere da implementação original ({len(amostra)} linhas)")
+
+
+def _apps_render(inicio):
+    metas = {f"{mes:02d}/{inicio.year}": 1_000_000 for mes in range(1, 13)}
+    return {
+        "vendas": lambda: AppTest.from_function(_app_vendas, args=(PEOPLE_ID,), default_timeout=TIMEOUT_RENDER),
+        "gestao_pedidos": lambda: AppTest.from_function(_app_gestao_pedidos, args=(PEOPLE_ID,),
+                                                        default_timeout=TIMEOUT_RENDER),
+        "kpi": lambda: AppTest.from_function(_app_kpi, args=(PEOPLE_ID, metas, metas),
+                                             default_timeout=TIMEOUT_RENDER),
+    }
+
+
+def executar_tamanho(linhas, repeticoes):
+    """Todas as medições para um tamanho de dados."""
+    inicio, fim = _periodo()
+    t0 = time.perf_counter()
+    dados = gerar_dados(linhas, inicio, fim, people_id=PEOPLE_ID)
+    print(f"[{linhas:,} linhas] dados gerados em {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    cliente = ClienteFalso(dados)
+    definir_cliente(cliente, cliente_leitura=cliente)
+    metricas.limpar()
+    verificar_paginacao(inicio, fim)
+    verificar_grid_html(inicio, fim)
+    _limpar_caches()
+    metricas.limpar()
+
+    resultados = []
+    for aba, funcao in _etapas_preparacao(linhas, inicio, fim).items():
+        for cache, medida in _medir(funcao, cliente, repeticoes).items():
+            resultados.append({"linhas": linhas, "etapa": "preparacao", "aba": aba, "cache": cache, **medida})
+
+    for aba, criar_app in _apps_render(inicio).items():
+        # Um AppTest novo a cada repetição: o estado de sessão começa vazio, como um novo usuário
+        apps = []
+
+        def render():
+            apps.append(criar_app())
+            _renderizar(apps[-1])
+
+        def rerun():
+            _renderizar(apps[-1])
+
+        amostras = {"frio": [], "quente": []}
+        for _ in range(repeticoes):
+            _limpar_caches()
+            amostras["frio"].append(_cronometrar(render, cliente))
+            amostras["quente"].append(_cronometrar(rerun, cliente))
+        for cache, valores in amostras.items():
+            resultados.append({"linhas": linhas, "etapa": "render", "aba": aba, "cache": cache,
+                               "segundos": statistics.median(t for t, _ in valores),
+                               "segundos_cliente_falso": statistics.median(f for _, f in valores),
+                               "amostras": [round(t, 4) for t, _ in valores]})
+
+    detalhamento = metricas.resumo()["duracoes"]
+    _limpar_caches()
+    return resultados, detalhamento
+
+
+def _ambiente():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "plataforma": platform.platform(),
+            "pandas": pd.__version__, "pyarrow": pa.__version__, "streamlit": st.__version__}
+
+
+def _chave(resultado):
+    return resultado["linhas"], resultado["etapa"], resultado["aba"], resultado["cache"]
+
+
+def comparar(base, atual, tolerancia):
+    """Medições de `atual` mais lentas que as de `base` além da tolerância (fração, ex.: 0.25)."""
+    referencia = {_chave(r): r["segundos"] for r in base["resultados"]}
+    regressoes = []
+    for resultado in atual["resultados"]:
+        anterior = referencia.get(_chave(resultado))
+        if anterior is None:
+            continue
+        if resultado["segundos"] > anterior * (1 + tolerancia) and resultado["segundos"] - anterior > FOLGA_COMPARACAO:
+            regressoes.append({**dict(zip(("linhas", "etapa", "aba", "cache"), _chave(resultado))),
+                               "base": anterior, "atual": resultado["segundos"]})
+    return regressoes
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard com dados sintéticos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS_PADRAO,
+                        help="linhas por view em cada rodada (padrão: 10k, 100k e 1M)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="repetições de cada medição (mediana)")
+    parser.add_argument("--saida", default="benchmarks/resultados.json", help="arquivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior, usado como base")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="aumento relativo aceito em relação à base antes de acusar regressão")
+    parser.add_argument("--logs", action="store_true", help="mantém os logs estruturados das métricas")
+    args = parser.parse_args(argumentos)
+
+    metricas.LOG_ATIVO = args.logs
+    saida = {"data": datetime.now().isoformat(timespec="seconds"), "ambiente": _ambiente(),
+             "repeticoes": args.repeticoes, "resultados": [], "detalhamento": {}}
+    for linhas in args.linhas:
+        resultados, detalhamento = executar_tamanho(linhas, args.repeticoes)
+        saida["resultados"].extend(resultados)
+        saida["detalhamento"][str(linhas)] = detalhamento
+        for r in resultados:
+            print(f"{r['linhas']:>10,} {r['etapa']:<11} {r['aba']:<15} {r['cache']:<7} {r['segundos']:8.3f}s"
+                  f"  (cliente falso {r['segundos_cliente_falso']:.3f}s)")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            saida["regressoes"] = comparar(json.load(arquivo), saida, args.tolerancia)
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(saida, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.saida}", file=sys.stderr)
+
+    for regressao in saida.get("regressoes", []):
+        print(f"REGRESSÃO: {regressao}", file=sys.stderr)
+    return 1 if saida.get("regressoes") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# benchmarks/importacao.py
+"""Orçamento de tempo de importação: o custo, por módulo, de subir o dashboard e cada aba.
+
+Cada alvo é importado num processo Python novo, depois dos módulos que já estão
+carregados naquele momento no servidor (o Streamlit, na inicialização; a
+inicialização, nas abas). Assim, cada medição é o custo incremental do alvo.
+O script falha se algum alvo passar do orçamento ou se a inicialização carregar
+um módulo pesado que só as abas deveriam carregar.
+
+Uso, na raiz do projeto:
+    python -m benchmarks.importacao
+    python -m benchmarks.importacao --repeticoes 7 --top 30
+    python -m benchmarks.importacao --fator 2   # máquina mais lenta que o Cloud Run
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARCA = "--- inicio da medicao ---"
+
+# Módulos que o dashboard.py importa antes da primeira tela
+INICIALIZACAO = ["functions.fc_peoples", "functions.metricas", "functions.prefetch"]
+
+# alvo -> (já carregados, módulos medidos, orçamento em segundos)
+ALVOS = {
+    "inicializacao": (["streamlit"], INICIALIZACAO, 0.6),
+    "aba_vendas": (["streamlit", *INICIALIZACAO], ["tabs.vendas"], 1.2),
+    "aba_gestao_pedidos": (["streamlit", *INICIALIZACAO], ["tabs.gestao_pedidos"], 1.2),
+    "aba_kpi": (["streamlit", *INICIALIZACAO], ["tabs.kpi"], 1.2),
+}
+
+# Só as abas (e as consultas) podem carregar estes módulos
+PROIBIDOS_NA_INICIALIZACAO = ["pandas", "pyarrow", "google.cloud.bigquery", "google.cloud.bigquery_storage",
+                              "plotly.express"]
+
+_CODIGO = """
+import importlib, json, sys, time
+for modulo in {carregados!r}:
+    importlib.import_module(modulo)
+sys.stderr.write({marca!r} + "\\n")
+sys.stderr.flush()
+inicio = time.perf_counter()
+for modulo in {medidos!r}:
+    importlib.import_module(modulo)
+print(json.dumps({{"segundos": time.perf_counter() - inicio, "modulos": sorted(sys.modules)}}))
+"""
+
+
+def _importar(carregados, medidos, importtime=False):
+    """Importa `medidos` num processo novo; devolve (segundos, módulos carregados, stderr)."""
+    comando = [sys.executable, *(["-X", "importtime"] if importtime else []),
+               "-c", _CODIGO.format(carregados=carregados, medidos=medidos, marca=MARCA)]
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, PAYVIP_METRICAS_LOG="0")
+    processo = subprocess.run(comando, cwd=RAIZ, env=ambiente, capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {medidos}:\n{processo.stderr[-2000:]}")
+    resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+    return resultado["segundos"], resultado["modulos"], processo.stderr
+
+
+def custo_por_modulo(stderr):
+    """Linhas do -X importtime depois da marca: módulo, tempo próprio e acumulado (segundos), profundidade."""
+    linhas = stderr.split(MARCA, 1)[-1].splitlines()
+    custos = []
+    for linha in linhas:
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        if not proprio.strip().isdigit():
+            continue  # cabeçalho
+        custos.append({"modulo": nome.strip(), "proprio": int(proprio) / 1e6, "acumulado": int(acumulado) / 1e6,
+                       "profundidade": (len(nome) - len(nome.lstrip()) - 1) // 2})
+    return custos
+
+
+def _pacote(modulo):
+    partes = modulo.split(".")
+    # google.* reúne bibliotecas independentes (google.cloud.bigquery, google.api_core...)
+    return ".".join(partes[:3] if partes[0] == "google" else partes[:1])
+
+
+def custo_por_pacote(custos):
+    """Tempo próprio somado por pacote, do mais caro para o mais barato."""
+    pacotes = {}
+    for custo in custos:
+        pacote = _pacote(custo["modulo"])
+        pacotes[pacote] = pacotes.get(pacote, 0.0) + custo["proprio"]
+    return dict(sorted(pacotes.items(), key=lambda item: item[1], reverse=True))
+
+
+def medir_alvo(carregados, medidos, repeticoes):
+    """Mediana do tempo de importação e o detalhamento por módulo (de uma execução com -X importtime)."""
+    tempos = []
+    modulos = []
+    for _ in range(repeticoes):
+        segundos, modulos, _ = _importar(carregados, medidos)
+        tempos.append(segundos)
+    _, _, stderr = _importar(carregados, medidos, importtime=True)
+    return {"segundos": statistics.median(tempos), "amostras": [round(t, 4) for t in tempos],
+            "modulos_carregados": modulos, "custos": custo_por_modulo(stderr)}
+
+
+def _imprimir(alvo, medida, orcamento, top):
+    situacao = "ok" if medida["segundos"] <= orcamento else "ACIMA DO ORÇAMENTO"
+    print(f"\n{alvo}: {medida['segundos']:.3f}s (orçamento {orcamento:.2f}s) {situacao}")
+    print("  por pacote:")
+    for pacote, segundos in list(custo_por_pacote(medida["custos"]).items())[:top]:
+        print(f"    {segundos:8.4f}s  {pacote}")
+    print("  por módulo:")
+    for custo in sorted(medida["custos"], key=lambda c: c["proprio"], reverse=True)[:top]:
+        print(f"    {custo['proprio']:8.4f}s próprio  {custo['acumulado']:8.4f}s acumulado  {custo['modulo']}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação do dashboard.")
+    parser.add_argument("--repeticoes", type=int, default=5, help="processos por alvo (mediana)")
+    parser.add_argument("--top", type=int, default=10, help="pacotes e módulos mais caros listados por alvo")
+    parser.add_argument("--fator", type=float, default=1.0, help="multiplica os orçamentos (máquinas mais lentas)")
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    args = parser.parse_args(argumentos)
+
+    falhas = []
+    saida = {}
+    for alvo, (carregados, medidos, orcamento) in ALVOS.items():
+        medida = medir_alvo(carregados, medidos, args.repeticoes)
+        orcamento *= args.fator
+        saida[alvo] = {"orcamento": orcamento, "pacotes": custo_por_pacote(medida["custos"]),
+                       **{k: v for k, v in medida.items() if k != "modulos_carregados"}}
+
+        _imprimir(alvo, medida, orcamento, args.top)
+        if medida["segundos"] > orcamento:
+            falhas.append(f"{alvo} levou {medida['segundos']:.3f}s (orçamento {orcamento:.2f}s)")
+
+        if alvo == "inicializacao":
+            carregados_indevidos = [modulo for modulo in PROIBIDOS_NA_INICIALIZACAO
+                                    if modulo in medida["modulos_carregados"]]
+            for modulo in carregados_indevidos:
+                falhas.append(f"a inicialização carrega {modulo}, que só as abas deveriam carregar")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(saida, arquivo, indent=2, ensure_ascii=False)
+
+    for falha in falhas:
+        print(f"FALHA: {falha}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
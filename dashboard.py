@@ -1,7 +1,8 @@
 import sys
 import os
+import importlib
 import streamlit as st
-from google.cloud import firestore
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Adiciona a pasta raiz do projeto ao caminho do Python
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__)))
@@ -9,8 +10,13 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 # --- IMPORTAÇÕES ---
+# As abas (e, com elas, BigQuery, Plotly e PyArrow) são importadas só quando são
+# renderizadas pela primeira vez no processo (ver renderizar_aba): a página e a
+# leitura da configuração no Firestore não esperam por bibliotecas que ainda não usam.
 try:
-    from tabs import vendas, kpi, gestao_pedidos
+    from functions.fc_peoples import config_people
+    from functions.metricas import contexto, medir, exportar_prometheus, resumo
+    from functions.prefetch import agendar_prefetch, aquecer_inicializacao
 except ImportError as e:
     st.error(f"Erro de importação: {e}. Verifique a estrutura de pastas e os arquivos.")
     st.stop()
@@ -43,6 +49,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Aquece, uma vez por processo, o cache dos people_ids de maior tráfego (se configurados)
+aquecer_inicializacao()
+
 # --- LÓGICA PRINCIPAL DE ORQUESTRAÇÃO ---
 people_id = st.query_params.get("people_id")
 
@@ -50,29 +59,36 @@ if not people_id:
     st.error("Parâmetro 'people_id' não encontrado na URL.")
     st.stop()
 
-exibe_kpi = False
-exibe_gestao_pedidos = False
-gmv_metas = {}
-tpv_metas = {}
 try:
-    db = firestore.Client()
-    people_doc = db.collection('peoples').document(people_id).get()
-    if people_doc.exists:
-        people_data = people_doc.to_dict()
-
-        if people_data.get("kpi_control") == "S":
-            exibe_kpi = True
-            kpis_data = people_data.get('kpis', [{}])[0]
-            for item in kpis_data.get('GMV', []): gmv_metas.update(item)
-            for item in kpis_data.get('TPV', []): tpv_metas.update(item)
-
-        if people_data.get("dashboard_order_control") == "S":
-            exibe_gestao_pedidos = True
-
+    config = config_people(people_id)
 except Exception as e:
     st.error(f"Erro ao buscar dados no Firestore: {e}")
     st.stop()
 
+exibe_kpi = config["exibe_kpi"]
+exibe_gestao_pedidos = config["exibe_gestao_pedidos"]
+gmv_metas = config["gmv_metas"]
+tpv_metas = config["tpv_metas"]
+
+
+@st.fragment
+def renderizar_aba(aba, *args):
+    """Importa o módulo da aba (tabs/<aba>.py) e o renderiza, medindo o tempo total.
+
+    A aba roda como fragmento: mudar o período (ou o mês da meta, no KPI) reexecuta
+    só a aba, sem reler a configuração nem refazer o restante do dashboard. As
+    consultas feitas dentro da aba levam people_id e aba nos logs.
+    """
+    with contexto(people_id=people_id, aba=aba), medir("render_aba", aba=aba):
+        try:
+            with medir("importar_aba", aba=aba):
+                modulo = importlib.import_module(f"tabs.{aba}")
+        except ImportError as e:
+            st.error(f"Erro de importação: {e}. Verifique a estrutura de pastas e os arquivos.")
+            return
+        modulo.render(*args)
+
+
 if 'page_number' not in st.session_state:
     st.session_state.page_number = 0
 
@@ -83,23 +99,61 @@ if exibe_gestao_pedidos:
 if exibe_kpi:
     tab_names.append("KPI")
 
+# Widgets de abas que não são renderizadas numa execução perdem o estado. Como
+# apenas a aba ativa é executada, preservamos aqui os filtros de cada aba. Os
+# valores iniciais são gravados pelas abas no session_state (setdefault), e não
+# em value=/index=: widget com valor padrão e valor via Session State gera aviso.
+for chave_filtro in ("filtro_vendas", "vendas_filtro_cliente", "filtro_gestao_pedidos", "kpi_mes_meta"):
+    if chave_filtro in st.session_state:
+        st.session_state[chave_filtro] = st.session_state[chave_filtro]
+
 if len(tab_names) > 1:
-    tabs = st.tabs(tab_names)
+    # on_change="rerun" liga o rastreamento da aba ativa: só a aba aberta busca
+    # dados e monta gráficos; as demais carregam quando forem selecionadas.
+    tabs = st.tabs(tab_names, key="aba_ativa", on_change="rerun")
 
     # Renderiza a aba Vendas (sempre a primeira)
     with tabs[0]:
-        vendas.render(people_id)
+        if tabs[0].open:
+            renderizar_aba("vendas", people_id)
 
     # Renderiza a aba Gestão de Pedidos, se existir
     if exibe_gestao_pedidos:
-        with tabs[tab_names.index("Gestão de Pedidos")]:
-            gestao_pedidos.render(people_id)
+        aba_gestao = tabs[tab_names.index("Gestão de Pedidos")]
+        with aba_gestao:
+            if aba_gestao.open:
+                renderizar_aba("gestao_pedidos", people_id)
 
     # Renderiza a aba KPI, se existir
     if exibe_kpi:
-        with tabs[tab_names.index("KPI")]:
-            kpi.render(people_id, gmv_metas, tpv_metas)
+        aba_kpi = tabs[tab_names.index("KPI")]
+        with aba_kpi:
+            if aba_kpi.open:
+                renderizar_aba("kpi", people_id, gmv_metas, tpv_metas)
 else:
     # Caso apenas a aba de Vendas seja exibida
     st.markdown('<style>.stTabs { display: none; }</style>', unsafe_allow_html=True)
-    vendas.render(people_id)
\ No newline at end of file
+    renderizar_aba("vendas", people_id)
+
+# --- AQUECIMENTO DO CACHE DA SESSÃO ---
+# Depois da primeira tela, busca em segundo plano o que o usuário provavelmente abre
+# em seguida (KPI do ano, mês anterior, Gestão de Pedidos), uma vez por sessão.
+# Tarefas de sessões já encerradas são descartadas antes de chegar ao BigQuery.
+contexto_execucao = get_script_run_ctx()
+if contexto_execucao is not None and not st.session_state.get("prefetch_agendado"):
+    st.session_state["prefetch_agendado"] = True
+    agendar_prefetch(contexto_execucao.session_id, people_id, exibe_kpi, exibe_gestao_pedidos)
+
+# --- PAINEL DE DEBUG ---
+# Com ?debug=1 na URL, mostra os tempos acumulados do processo (consultas, abas,
+# gráficos), os contadores e as estatísticas dos caches, além do texto Prometheus.
+if st.query_params.get("debug") == "1":
+    with st.expander("Métricas de desempenho", expanded=True):
+        metricas = resumo()
+        st.markdown("**Caches**")
+        st.dataframe(metricas["caches"])
+        st.markdown("**Tempos**")
+        st.dataframe(sorted(metricas["duracoes"], key=lambda linha: linha["total_s"], reverse=True))
+        st.markdown("**Contadores**")
+        st.dataframe(metricas["contadores"])
+        st.code(exportar_prometheus(), language="text")
@@ -0,0 +1,67 @@
+# functions/busca.py
+
+import sys
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos, para comparar nomes digitados de qualquer jeito."""
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold().strip()
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBusca:
+    """Índice de busca por substring sobre uma coluna de nomes.
+
+    Montado uma única vez por conjunto de dados: os nomes distintos são normalizados
+    (minúsculas, sem acentos) e indexados por trigramas. Uma busca com 3 ou mais
+    caracteres cruza as listas dos trigramas do termo e só confere os candidatos,
+    sem percorrer todas as linhas; termos menores percorrem apenas os nomes distintos.
+    O resultado são as posições (iloc) das linhas que casam, na ordem original.
+    """
+
+    def __init__(self, nomes):
+        nomes = pd.Series(nomes)
+        codigos, unicos = pd.factorize(nomes, use_na_sentinel=True)
+        self.total_linhas = len(nomes)
+        self._textos = [normalizar_texto(nome) for nome in unicos]
+
+        # Posições das linhas de cada nome distinto, agrupadas a partir dos códigos
+        ordem = np.argsort(codigos, kind='stable')
+        fronteiras = np.searchsorted(codigos[ordem], np.arange(len(unicos) + 1))
+        self._posicoes = [ordem[fronteiras[i]:fronteiras[i + 1]] for i in range(len(unicos))]
+
+        self._trigramas = {}
+        for id_nome, texto in enumerate(self._textos):
+            for trigrama in _trigramas(texto):
+                self._trigramas.setdefault(trigrama, []).append(id_nome)
+
+    def buscar(self, termo):
+        """Posições das linhas cujo nome contém `termo` (sem diferenciar maiúsculas e acentos)."""
+        termo = normalizar_texto(termo)
+        if not termo:
+            return np.arange(self.total_linhas)
+
+        if len(termo) >= 3:
+            listas = sorted((self._trigramas.get(t, []) for t in _trigramas(termo)), key=len)
+            candidatos = set(listas[0]).intersection(*listas[1:])
+        else:
+            candidatos = range(len(self._textos))
+
+        encontrados = [self._posicoes[i] for i in candidatos if termo in self._textos[i]]
+        if not encontrados:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(encontrados))
+
+    def tamanho_em_bytes(self):
+        """Estimativa de memória, usada pelo orçamento do CacheLimitado."""
+        return (sum(sys.getsizeof(texto) for texto in self._textos)
+                + sum(posicoes.nbytes for posicoes in self._posicoes)
+                + sum(sys.getsizeof(ids) + 8 * len(ids) for ids in self._trigramas.values()))
@@ -0,0 +1,385 @@
+# functions/cache.py
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+
+from functions.metricas import contar
+
+FORMATO_DATA_HORA = '%Y-%m-%d %H:%M:%S'
+
+# Os dados do BigQuery estão em GMT-3 (created_at_gmt_minus_3). O "dia atual" do
+# cache precisa seguir esse fuso, e não o do container (UTC no Cloud Run).
+FUSO_DADOS = timezone(timedelta(hours=-3))
+
+# Orçamento de memória do cache (em bytes, medido pelo memory_usage dos DataFrames)
+# e tempos de vida: curto para dias que ainda recebem dados, longo para dias fechados.
+LIMITE_BYTES_CACHE = int(os.environ.get("PAYVIP_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+TTL_PERIODO_ABERTO = 5 * 60
+TTL_PERIODO_FECHADO = 12 * 60 * 60
+
+
+def hoje():
+    """Data atual no fuso dos dados (GMT-3)."""
+    return datetime.now(FUSO_DADOS).date()
+
+
+def _para_data(valor):
+    """Converte 'YYYY-MM-DD HH:MM:SS' (ou date/datetime) em date."""
+    if isinstance(valor, str):
+        return datetime.strptime(valor[:10], '%Y-%m-%d').date()
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+def ttl_do_periodo(end_date):
+    """TTL para um resultado que termina em `end_date`: curto se o período ainda está aberto."""
+    return TTL_PERIODO_ABERTO if _para_data(end_date) >= hoje() else TTL_PERIODO_FECHADO
+
+
+def _intervalos_continuos(dias):
+    """Agrupa uma lista ordenada de dias em intervalos contínuos (inicio, fim)."""
+    intervalos = []
+    for dia in dias:
+        if intervalos and dia - intervalos[-1][1] == timedelta(days=1):
+            intervalos[-1][1] = dia
+        else:
+            intervalos.append([dia, dia])
+    return [tuple(intervalo) for intervalo in intervalos]
+
+
+def _dividir_por_dia(df, coluna_data, inicio, fim):
+    """Quebra um resultado em um DataFrame por dia; dias sem linhas recebem um frame vazio."""
+    import pandas as pd
+    vazio = df.iloc[0:0]
+    segmentos = {}
+    if not df.empty:
+        datas = pd.to_datetime(df[coluna_data], errors='coerce')
+        if datas.dt.tz is not None:
+            datas = datas.dt.tz_localize(None)
+        for dia, parte in df.groupby(datas.dt.normalize(), sort=False):
+            segmentos[dia.date()] = parte.reset_index(drop=True)
+
+    dia = inicio
+    while dia <= fim:
+        segmentos.setdefault(dia, vazio)
+        dia += timedelta(days=1)
+    return segmentos
+
+
+def _unificar_categorias(partes):
+    """Alinha as categorias das colunas categóricas para que o concat mantenha o dtype."""
+    import pandas as pd
+    colunas = [coluna for coluna in partes[0].columns
+               if all(isinstance(parte[coluna].dtype, pd.CategoricalDtype) for parte in partes)]
+    for coluna in colunas:
+        categorias = pd.Index(partes[0][coluna].cat.categories)
+        for parte in partes[1:]:
+            categorias = categorias.union(parte[coluna].cat.categories, sort=False)
+        partes = [parte.assign(**{coluna: parte[coluna].cat.set_categories(categorias)}) for parte in partes]
+    return partes
+
+
+def _concatenar(partes):
+    """Junta os segmentos de um período mantendo o schema mesmo quando todos estão vazios."""
+    import pandas as pd
+    com_dados = [parte for parte in partes if not parte.empty]
+    if not com_dados:
+        return partes[0].copy(deep=False) if partes else pd.DataFrame()
+    if len(com_dados) == 1:
+        return com_dados[0].copy(deep=False)
+    return pd.concat(_unificar_categorias(com_dados), ignore_index=True)
+
+
+def _tamanho_em_bytes(valor):
+    """Memória ocupada por um valor do cache (DataFrames medidos com deep=True).
+
+    Tuplas e listas somam os seus itens; objetos próprios podem informar o tamanho
+    por um método `tamanho_em_bytes()`.
+    """
+    # O pandas é importado só pelas abas: o cache da configuração (fc_peoples), usado
+    # antes da primeira tela, não deve carregá-lo. Sem pandas carregado, não há DataFrame.
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True, index=True).sum())
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(_tamanho_em_bytes(item) for item in valor)
+    if hasattr(valor, "tamanho_em_bytes"):
+        return int(valor.tamanho_em_bytes())
+    return sys.getsizeof(valor)
+
+
+def _compartilhado(valor):
+    """Cópia rasa dos DataFrames de um valor do cache (também dentro de tuplas).
+
+    Os valores do cache são compartilhados entre sessões e devem ser tratados como
+    somente leitura. Com o Copy-on-Write do pandas (3.0+), a cópia rasa não copia
+    dados: só cria um objeto novo, e qualquer alteração nele (atribuir uma coluna,
+    por exemplo) copia o que mudou, sem tocar no original guardado. Os arrays
+    devolvidos por to_numpy() também chegam como somente leitura.
+    """
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(valor, pd.DataFrame):
+        return valor.copy(deep=False)
+    if isinstance(valor, tuple):
+        return tuple(_compartilhado(item) for item in valor)
+    return valor
+
+
+class CacheLimitado:
+    """Cache LRU com orçamento de bytes e tempo de vida (TTL) por entrada.
+
+    Quando uma nova entrada ultrapassa o orçamento, as entradas usadas há mais tempo
+    são descartadas até caber. Entradas vencidas são removidas ao serem lidas.
+    Os contadores de acerto, falta, descarte e expiração ficam em `estatisticas()`.
+    """
+
+    def __init__(self, limite_bytes=LIMITE_BYTES_CACHE, ttl_padrao=None):
+        self.limite_bytes = limite_bytes
+        self.ttl_padrao = ttl_padrao
+        self._entradas = OrderedDict()  # chave -> (valor, tamanho, expira_em)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._contadores = {"acertos": 0, "faltas": 0, "descartes": 0, "expiracoes": 0}
+
+    def obter(self, chave, padrao=None, contabilizar=True):
+        """Valor guardado em `chave` (ou `padrao`).
+
+        Com contabilizar=False, a leitura não entra nos acertos e faltas: serve para
+        conferir de novo uma chave cuja falta já foi contada (ver fc_dash_vendas._em_cache).
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                if contabilizar:
+                    self._contadores["faltas"] += 1
+                return padrao
+            valor, tamanho, expira_em = entrada
+            if expira_em is not None and expira_em <= time.monotonic():
+                self._remover(chave)
+                self._contadores["expiracoes"] += 1
+                if contabilizar:
+                    self._contadores["faltas"] += 1
+                return padrao
+            self._entradas.move_to_end(chave)
+            if contabilizar:
+                self._contadores["acertos"] += 1
+            return _compartilhado(valor)
+
+    def vida_restante(self, chave):
+        """Segundos até `chave` vencer: None se não existir ou não tiver TTL (não conta acerto nem falta)."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[2] is None:
+                return None
+            return max(entrada[2] - time.monotonic(), 0)
+
+    def guardar(self, chave, valor, ttl=None, tamanho=None):
+        """Guarda `valor`; `tamanho` (em bytes) substitui a estimativa automática quando informado."""
+        ttl = self.ttl_padrao if ttl is None else ttl
+        tamanho = _tamanho_em_bytes(valor) if tamanho is None else tamanho
+        if tamanho > self.limite_bytes:
+            return
+        expira_em = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            while self._entradas and self._bytes + tamanho > self.limite_bytes:
+                self._remover(next(iter(self._entradas)))
+                self._contadores["descartes"] += 1
+            self._entradas[chave] = (valor, tamanho, expira_em)
+            self._bytes += tamanho
+
+    def remover_onde(self, condicao):
+        """Remove todas as entradas cuja chave satisfaz `condicao(chave)`."""
+        with self._lock:
+            for chave in [chave for chave in self._entradas if condicao(chave)]:
+                self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self._contadores, entradas=len(self._entradas), bytes=self._bytes,
+                        limite_bytes=self.limite_bytes)
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+
+class ChamadaUnica:
+    """Coalescência de chamadas idênticas simultâneas (single-flight).
+
+    A primeira chamada com uma chave executa a função; as que chegam com a mesma
+    chave enquanto ela está em andamento esperam e recebem o mesmo resultado (ou a
+    mesma exceção), em vez de disparar outra query igual no BigQuery. Nada fica
+    guardado depois: o resultado deve ser gravado no cache dentro da própria função,
+    para que quem chegar depois já o encontre lá.
+    """
+
+    def __init__(self, nome):
+        self.nome = nome
+        self._em_andamento = {}  # chave -> Future
+        self._lock = threading.Lock()
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = self._em_andamento[chave] = Future()
+        if not lider:
+            contar("chamadas_coalescidas", origem=self.nome)
+            return _compartilhado(futuro.result())
+
+        try:
+            resultado = funcao()
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return _compartilhado(resultado)
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+
+
+class CacheSegmentos:
+    """Cache de resultados por (consulta, people_id, dia).
+
+    Um período pedido é montado a partir dos dias já guardados; apenas os dias que
+    faltam são buscados, agrupados em intervalos contínuos para gerar o menor número
+    de queries possível. O dia atual (e qualquer dia futuro) ainda recebe dados novos,
+    por isso fica guardado só por TTL_PERIODO_ABERTO; dias fechados ficam por
+    TTL_PERIODO_FECHADO. O armazenamento é um CacheLimitado, que impõe o orçamento
+    de memória. Com um `disco` (CacheDisco), os dias fechados também são gravados em
+    arquivo e lidos de lá quando faltam na memória, antes de ir ao BigQuery; o dia
+    lido do disco fica em memória só pelo que resta da vida do arquivo.
+
+    O período montado também fica guardado, com o TTL do seu último dia (ou menos, se
+    algum dia já guardado vence antes): os reruns e
+    as demais sessões que pedem o mesmo período recebem o mesmo frame (numa cópia
+    rasa), em vez de concatenar de novo os segmentos de cada dia.
+
+    `derivados` são outros caches (CacheLimitado) com resultados montados a partir
+    dos segmentos, com chaves (nome, people_id, ...): quando os segmentos de um
+    people_id são substituídos por preencher, as entradas dele nesses caches caem.
+    """
+
+    def __init__(self, armazenamento=None, disco=None, derivados=()):
+        self.armazenamento = armazenamento if armazenamento is not None else CacheLimitado()
+        self.disco = disco
+        self.derivados = list(derivados)
+        self._chamadas = ChamadaUnica("segmentos")
+
+    def obter(self, consulta, people_id, start_date, end_date, buscar, coluna_data='created_at_gmt_minus_3'):
+        """Retorna o período [start_date, end_date] usando `buscar(people_id, inicio, fim)` para os dias faltantes."""
+        inicio, fim = _para_data(start_date), _para_data(end_date)
+        periodo = self.armazenamento.obter((consulta, people_id, (inicio, fim)))
+        contar("periodos_montados", consulta=consulta, resultado="acerto" if periodo is not None else "falta")
+        if periodo is not None:
+            return periodo
+        # Sessões que pedem o mesmo período ao mesmo tempo (ou o prefetch e a aba)
+        # compartilham uma única montagem e, portanto, uma única query por intervalo
+        return self._chamadas.executar((consulta, people_id, inicio, fim),
+                                       lambda: self._montar(consulta, people_id, inicio, fim, buscar, coluna_data))
+
+    def _montar(self, consulta, people_id, inicio, fim, buscar, coluna_data):
+        dias = [inicio + timedelta(days=n) for n in range((fim - inicio).days + 1)]
+
+        # Guardamos as referências já lidas: um segmento pode ser descartado pelo LRU
+        # enquanto os dias faltantes são buscados.
+        existentes = {}
+        do_disco = 0
+        dia_atual = hoje()
+        for dia in dias:
+            segmento = self.armazenamento.obter((consulta, people_id, dia))
+            if segmento is None and self.disco is not None and dia < dia_atual:
+                lido = self.disco.ler(consulta, people_id, dia)
+                if lido is not None:
+                    segmento, restante = lido
+                    ttl = TTL_PERIODO_FECHADO if restante is None else min(restante, TTL_PERIODO_FECHADO)
+                    do_disco += 1
+                    self.armazenamento.guardar((consulta, people_id, dia), segmento, ttl=ttl)
+            if segmento is not None:
+                existentes[dia] = segmento
+        faltantes = [dia for dia in dias if dia not in existentes]
+
+        # Origem dos dias de cada pedido: memória, disco ou BigQuery (taxa de acerto por consulta)
+        contar("segmentos_dia", len(existentes) - do_disco, consulta=consulta, origem="memoria")
+        contar("segmentos_dia", do_disco, consulta=consulta, origem="disco")
+        contar("segmentos_dia", len(faltantes), consulta=consulta, origem="bigquery")
+
+        novos = {}
+        for inicio_intervalo, fim_intervalo in _intervalos_continuos(faltantes):
+            df = buscar(
+                people_id,
+                datetime.combine(inicio_intervalo, datetime.min.time()).strftime(FORMATO_DATA_HORA),
+                datetime.combine(fim_intervalo, datetime.max.time()).strftime(FORMATO_DATA_HORA),
+            )
+            novos.update(_dividir_por_dia(df, coluna_data, inicio_intervalo, fim_intervalo))
+
+        self._guardar_segmentos(consulta, people_id, novos)
+        resultado = _concatenar([novos[dia] if dia in novos else existentes[dia] for dia in dias])
+        # Um período de um dia só já é o próprio segmento
+        if inicio != fim:
+            # O período não pode durar mais que o dia já guardado mais perto de vencer
+            vidas = [self.armazenamento.vida_restante((consulta, people_id, dia)) for dia in existentes]
+            ttl = min([ttl_do_periodo(fim), *(vida for vida in vidas if vida is not None)])
+            self.armazenamento.guardar((consulta, people_id, (inicio, fim)), resultado, ttl=ttl)
+        return resultado
+
+    def _guardar_segmentos(self, consulta, people_id, segmentos):
+        """Guarda os segmentos {dia: DataFrame} na memória e, os dias fechados, no disco.
+
+        Os segmentos vêm de um mesmo resultado e têm as mesmas colunas: o tamanho de
+        cada um é estimado pelo número de linhas, a partir do maior deles, em vez de
+        medir centenas de frames pequenos com memory_usage(deep=True).
+        """
+        if not segmentos:
+            return
+        amostra = max(segmentos.values(), key=len)
+        fixo = _tamanho_em_bytes(amostra.iloc[0:0])
+        por_linha = (_tamanho_em_bytes(amostra) - fixo) / len(amostra) if len(amostra) else 0
+        dia_atual = hoje()
+        for dia, segmento in segmentos.items():
+            self.armazenamento.guardar((consulta, people_id, dia), segmento, ttl=ttl_do_periodo(dia),
+                                       tamanho=fixo + int(len(segmento) * por_linha))
+            if self.disco is not None and dia < dia_atual:
+                self.disco.gravar(consulta, people_id, dia, segmento)
+
+    def preencher(self, consulta, people_id, start_date, end_date, df, coluna_data='created_at_gmt_minus_3'):
+        """Grava `df`, já buscado para o período inteiro, como os segmentos diários do people_id.
+
+        Usado pela busca em lote (fc_dash_vendas.preencher_em_lote). Os períodos já
+        montados para o people_id nessa consulta, e as entradas dele nos caches
+        derivados, são descartados, para não servirem dados anteriores aos novos segmentos.
+        """
+        inicio, fim = _para_data(start_date), _para_data(end_date)
+        self._guardar_segmentos(consulta, people_id, _dividir_por_dia(df, coluna_data, inicio, fim))
+        self.armazenamento.remover_onde(lambda chave: chave[:2] == (consulta, people_id)
+                                        and isinstance(chave[2], tuple))
+        for derivado in self.derivados:
+            derivado.remover_onde(lambda chave: chave[1] == people_id)
+
+    def limpar(self, people_id=None):
+        """Remove os segmentos e os períodos montados de um people_id (ou todos, se não informado)."""
+        if people_id is None:
+            self.armazenamento.limpar()
+        else:
+            self.armazenamento.remover_onde(lambda chave: chave[1] == people_id)
+        if self.disco is not None:
+            self.disco.limpar(people_id)
+
+    def estatisticas(self):
+        return self.armazenamento.estatisticas()
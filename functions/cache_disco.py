@@ -0,0 +1,89 @@
+# functions/cache_disco.py
+
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+# Textos lidos do Arrow continuam em memória Arrow no pandas, sem virar objetos Python
+TIPOS_ARROW = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}.get
+
+
+def _nome_seguro(valor):
+    """Trecho de caminho seguro a partir de um identificador qualquer."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(valor))
+
+
+class CacheDisco:
+    """Segundo nível do cache de segmentos: um arquivo Arrow IPC por (consulta, people_id, dia).
+
+    Os arquivos são lidos com memory-map, então todos os processos do mesmo nó
+    compartilham as páginas do sistema operacional em vez de manter cópias próprias,
+    e o cache sobrevive a reinícios e cold starts. Qualquer diretório local ou montado
+    serve. Só dias fechados devem ser gravados; arquivos com mais de `idade_maxima`
+    segundos são ignorados, para que correções tardias (estornos, chargebacks)
+    acabem aparecendo.
+    """
+
+    def __init__(self, diretorio, idade_maxima=None):
+        self.diretorio = diretorio
+        self.idade_maxima = idade_maxima
+
+    def _caminho(self, consulta, people_id, dia):
+        return os.path.join(self.diretorio, _nome_seguro(consulta), _nome_seguro(people_id),
+                            f"{dia.isoformat()}.arrow")
+
+    def ler(self, consulta, people_id, dia):
+        """Segmento gravado para o dia e a sua vida restante, em segundos.
+
+        Retorna (DataFrame, segundos até o arquivo passar de `idade_maxima`), com None
+        no lugar dos segundos se não houver idade máxima; ou None se o arquivo não
+        existir, estiver vencido ou ilegível. Quem guarda o segmento em memória usa a
+        vida restante como TTL, para não servir o dia além da idade máxima.
+        """
+        caminho = self._caminho(consulta, people_id, dia)
+        try:
+            restante = None
+            if self.idade_maxima is not None:
+                restante = self.idade_maxima - (time.time() - os.path.getmtime(caminho))
+                if restante <= 0:
+                    return None
+            with pa.memory_map(caminho, 'r') as origem:
+                tabela = pa.ipc.open_file(origem).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+        return tabela.to_pandas(split_blocks=True, date_as_object=False, types_mapper=TIPOS_ARROW), restante
+
+    def gravar(self, consulta, people_id, dia, df):
+        """Grava o segmento de forma atômica (arquivo temporário + rename)."""
+        caminho = self._caminho(consulta, people_id, dia)
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+            try:
+                with os.fdopen(descritor, 'wb') as destino, pa.ipc.new_file(destino, tabela.schema) as escritor:
+                    escritor.write_table(tabela)
+                os.replace(temporario, caminho)
+            except BaseException:
+                os.unlink(temporario)
+                raise
+        except (OSError, pa.ArrowException):
+            # Falha de disco não pode derrubar o dashboard: o segmento continua em memória
+            pass
+
+    def limpar(self, people_id=None):
+        """Apaga os arquivos de um people_id (ou de todos)."""
+        if not os.path.isdir(self.diretorio):
+            return
+        for consulta in os.listdir(self.diretorio):
+            pasta_consulta = os.path.join(self.diretorio, consulta)
+            pastas = [os.path.join(pasta_consulta, _nome_seguro(people_id))] if people_id is not None \
+                else [os.path.join(pasta_consulta, nome) for nome in os.listdir(pasta_consulta)]
+            for pasta in pastas:
+                if os.path.isdir(pasta):
+                    for arquivo in os.listdir(pasta):
+                        os.unlink(os.path.join(pasta, arquivo))
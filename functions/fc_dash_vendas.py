@@ -1,129 +1,585 @@
 # functions/fc_dash_vendas.py
 
-import streamlit as st
-from google.cloud import bigquery
+import contextvars
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from functions.busca import IndiceBusca, normalizar_texto
+from functions.cache import CacheLimitado, CacheSegmentos, ChamadaUnica, TTL_PERIODO_FECHADO, ttl_do_periodo
+from functions.cache_disco import CacheDisco, TIPOS_ARROW
+from functions.metricas import contar, medir, registrar_fonte_estatisticas
+from functions.rollup import DIMENSOES_ITENS, DIMENSOES_PEDIDOS, DIMENSOES_TRANSACOES, SOMAS_PEDIDOS, painel_kpi, \
+    totais_mensais, transacoes_principais
 
-# A inicialização do cliente pode ficar fora das funções,
-# pois só precisa ser feita uma vez.
-client = bigquery.Client()
+# Resultados maiores que isso são baixados pela BigQuery Storage Read API, em
+# lotes Arrow; abaixo disso, abrir uma sessão de leitura custa mais que a API REST.
+LIMITE_LINHAS_REST = 10_000
 
+# Os clientes são únicos por processo e criados no primeiro uso (importar o módulo
+# não exige credenciais); definir_cliente permite trocá-los, como nos benchmarks.
+# As bibliotecas do Google também só são importadas no primeiro uso: elas são a
+# maior parte do tempo de importação deste módulo e atrasariam a primeira tela.
+client = None
+_cliente_leitura = None
+_lock_clientes = threading.Lock()
 
-# --- FUNÇÕES DE BUSCA DE DADOS (COM CACHE) ---
-# Estas são as funções que realmente acessam o banco de dados.
-# Aplicamos o cache aqui para que qualquer chamada a elas com os mesmos
-# parâmetros retorne o resultado guardado, sem fazer uma nova query.
-
-@st.cache_data
-def dados_pedidos(people_id, start_date, end_date):
-    """Busca todos os pedidos (concluídos) no período."""
-    query = """
-        SELECT *
-        FROM payvip_database.vw_order 
-        WHERE created_at_gmt_minus_3 BETWEEN @start_date AND @end_date
-          AND people_id_conciliation = @people_id
-          AND status IN ('PGCON')
+
+def _obter_cliente():
+    """Cliente do BigQuery, único por processo e criado no primeiro uso."""
+    global client
+    if client is None:
+        with _lock_clientes:
+            if client is None:
+                from google.cloud import bigquery
+                client = bigquery.Client()
+    return client
+
+
+def _obter_cliente_leitura():
+    """Cliente da Storage Read API, único por processo e criado no primeiro uso."""
+    global _cliente_leitura
+    if _cliente_leitura is None:
+        with _lock_clientes:
+            if _cliente_leitura is None:
+                from google.cloud import bigquery_storage
+                _cliente_leitura = bigquery_storage.BigQueryReadClient()
+    return _cliente_leitura
+
+
+def definir_cliente(cliente, cliente_leitura=None):
+    """Substitui os clientes do BigQuery (e da Storage Read API) usados pelas consultas.
+
+    Sem `cliente_leitura`, o cliente da Storage API volta a ser criado no primeiro uso.
+    """
+    global client, _cliente_leitura
+    with _lock_clientes:
+        client = cliente
+        _cliente_leitura = cliente_leitura
+
+
+# --- PROJEÇÃO DE COLUNAS POR ABA ---
+# Cada aba declara apenas as colunas que lê de cada view. As funções de busca
+# pedem ao BigQuery a união das colunas de todas as abas que compartilham a
+# mesma consulta: assim evitamos o SELECT * e continuamos com um único cache
+# por consulta, qualquer que seja a aba que a disparou.
+# A coluna de data entra sempre, pois o cache de segmentos divide os resultados por dia.
+COLUNA_DATA = "created_at_gmt_minus_3"
+COLUNAS_POR_ABA = {
+    "vendas": {
+        # Indicadores e gráficos vêm dos rollups; as linhas só servem à lista
+        "vw_transactions_split": ["transaction_id", "created_at_gmt_minus_3", "status", "amount",
+                                  "product_capture", "product_name", "customer_document"],
+    },
+}
+
+
+def colunas_da_view(view):
+    """Retorna a união ordenada das colunas que as abas leem de uma view."""
+    colunas = {COLUNA_DATA}
+    for colunas_aba in COLUNAS_POR_ABA.values():
+        colunas.update(colunas_aba.get(view, []))
+    return sorted(colunas)
+
+
+def _select(view, alias=None):
+    """Monta a lista de colunas do SELECT para uma view, com prefixo de alias opcional."""
+    prefixo = f"{alias}." if alias else ""
+    return ", ".join(f"{prefixo}{coluna}" for coluna in colunas_da_view(view))
+
+
+# --- NORMALIZAÇÃO DOS RESULTADOS ---
+# Feita uma única vez, quando o resultado chega do BigQuery (e antes de ir para o
+# cache), e não a cada interação nas abas. Os DataFrames entregues às abas já têm
+# os tipos finais e são compartilhados entre as sessões (cópias rasas, sem copiar
+# dados; ver cache._compartilhado): devem ser tratados como somente leitura, e as
+# abas derivam novos frames (assign, filtros) em vez de alterar os recebidos.
+COLUNAS_NUMERICAS = ["amount", "total_amount", "value", "value_paid", "value_pending", "total_split",
+                     "value_discount", "quantidade", "valor"]
+COLUNAS_CATEGORICAS = ["status", "product_capture", "entry_mode", "seller_principal"]
+COLUNAS_DATA_HORA = ["created_at_gmt_minus_3", "dia", "dia_pedido"]
+
+
+def _normalizar(df):
+    """Padroniza nomes de colunas e converte valores, datas e categorias para os tipos finais."""
+    df.columns = df.columns.str.strip().str.lower()
+    for coluna in df.columns:
+        if coluna in COLUNAS_NUMERICAS:
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce').fillna(0)
+        elif coluna in COLUNAS_DATA_HORA:
+            datas = pd.to_datetime(df[coluna], errors='coerce')
+            df[coluna] = datas.dt.tz_localize(None) if datas.dt.tz is not None else datas
+        elif coluna in COLUNAS_CATEGORICAS and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+# --- CONSULTAS AO BIGQUERY (SEM CACHE) ---
+# Estas são as funções que realmente acessam o banco de dados. Não devem ser
+# chamadas diretamente pelas abas: passam sempre pelo cache de segmentos abaixo.
+#
+# As consultas usadas pelas abas também rodam em lote: com uma lista de people_ids
+# no lugar de um só, filtram por `IN UNNEST(@people_ids)` e devolvem a coluna
+# COLUNA_LOTE com o people_id de cada linha (ver preencher_em_lote).
+COLUNA_LOTE = "people_id_lote"
+
+
+def _em_lote(people_id):
+    return isinstance(people_id, (list, tuple))
+
+
+def _filtro_people(coluna, people_id):
+    """Condição do WHERE que restringe `coluna` ao people_id (ou aos people_ids do lote)."""
+    return f"{coluna} IN UNNEST(@people_ids)" if _em_lote(people_id) else f"{coluna} = @people_id"
+
+
+def _coluna_lote(coluna, people_id):
+    """Trecho do SELECT com o people_id de cada linha, só nas consultas em lote."""
+    return f", {coluna} AS {COLUNA_LOTE}" if _em_lote(people_id) else ""
+
+
+def _agrupar_lote(people_id):
+    return f", {COLUNA_LOTE}" if _em_lote(people_id) else ""
+
+
+def _parametros(people_id, start_date, end_date, *extras):
+    """Configuração de job com os parâmetros comuns a todas as consultas (mais os extras).
+
+    Os extras são tuplas (nome, tipo, valor), como os parâmetros comuns.
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", start_date),
-            bigquery.ScalarQueryParameter("end_date", "TIMESTAMP", end_date),
-            bigquery.ScalarQueryParameter("people_id", "STRING", people_id),
-        ]
+    from google.cloud import bigquery
+    if _em_lote(people_id):
+        parametro_people = bigquery.ArrayQueryParameter("people_ids", "STRING", list(people_id))
+    else:
+        parametro_people = bigquery.ScalarQueryParameter("people_id", "STRING", people_id)
+    parametros = [("start_date", "TIMESTAMP", start_date), ("end_date", "TIMESTAMP", end_date), *extras]
+    return bigquery.QueryJobConfig(
+        query_parameters=[parametro_people, *(bigquery.ScalarQueryParameter(*parametro) for parametro in parametros)]
     )
-    df_orders = client.query(query, job_config=job_config).to_dataframe()
-    return df_orders
 
 
-@st.cache_data
-def dados_pedidos_total(people_id, start_date, end_date):
-    """Busca todos os pedidos (todos os status) no período."""
-    query = """
-        SELECT *
+def _baixar_arrow(linhas):
+    """Baixa o resultado como tabela Arrow: Storage Read API para resultados grandes, REST para os pequenos."""
+    if linhas.total_rows is not None and linhas.total_rows > LIMITE_LINHAS_REST:
+        from google.api_core.exceptions import GoogleAPICallError
+        try:
+            return linhas.to_arrow(bqstorage_client=_obter_cliente_leitura())
+        except GoogleAPICallError:
+            # Sem permissão de leitura pela Storage API (ou sessão recusada): segue pela REST
+            pass
+    return linhas.to_arrow(create_bqstorage_client=False)
+
+
+def _arrow_para_pandas(tabela):
+    """Converte a tabela Arrow já nos tipos finais das colunas de valor e categoria."""
+    for i, campo in enumerate(tabela.schema):
+        nome = campo.name.strip().lower()
+        if pa.types.is_decimal(campo.type):
+            # NUMERIC viria como objetos Decimal; convertemos direto para float64
+            tabela = tabela.set_column(i, campo.name, pc.cast(tabela.column(i), pa.float64()))
+        elif nome in COLUNAS_CATEGORICAS and pa.types.is_string(campo.type):
+            tabela = tabela.set_column(i, campo.name, pc.dictionary_encode(tabela.column(i)))
+    return tabela.to_pandas(date_as_object=False, types_mapper=TIPOS_ARROW)
+
+
+def _executar(consulta, query, people_id, start_date, end_date, *extras):
+    """Executa a query com os parâmetros do período e devolve o resultado normalizado.
+
+    `consulta` identifica a query nas métricas (tempo do job, do download e da
+    conversão, bytes processados e linhas) e no rótulo do job no BigQuery.
+    """
+    job_config = _parametros(people_id, start_date, end_date, *extras)
+    job_config.labels = {"consulta": consulta}
+    with medir("bigquery_job", consulta=consulta) as evento:
+        job = _obter_cliente().query(query, job_config=job_config)
+        linhas = job.result()
+        bytes_processados = job.total_bytes_processed or 0
+        evento.update(job_id=job.job_id, bytes_processados=bytes_processados, cache_bigquery=job.cache_hit)
+    contar("bytes_processados", bytes_processados, consulta=consulta)
+
+    with medir("bigquery_download", consulta=consulta) as evento:
+        tabela = _baixar_arrow(linhas)
+        evento.update(linhas=tabela.num_rows, bytes_arrow=tabela.nbytes)
+    contar("linhas_retornadas", tabela.num_rows, consulta=consulta)
+
+    with medir("conversao_pandas", consulta=consulta):
+        return _normalizar(_arrow_para_pandas(tabela))
+
+
+def _consultar_transacoes(people_id, start_date, end_date):
+    query = f"""
+        SELECT {_select("vw_transactions_split")}{_coluna_lote("people_id_conciliation", people_id)}
+        FROM payvip_database.vw_transactions_split
+        WHERE created_at_gmt_minus_3 BETWEEN @start_date AND @end_date
+          AND {_filtro_people("people_id_conciliation", people_id)}
+          AND seller_principal = 'S'
+    """
+    return _executar("transacoes", query, people_id, start_date, end_date)
+
+
+def _consultar_rollup_pedidos(people_id, start_date, end_date):
+    query = f"""
+        SELECT DATE(created_at_gmt_minus_3) AS dia, {", ".join(DIMENSOES_PEDIDOS)},
+               COUNT(*) AS quantidade,
+               COALESCE(SUM(SAFE_CAST(total_amount AS FLOAT64)), 0) AS valor,
+               {", ".join(f"COALESCE(SUM(SAFE_CAST({c} AS FLOAT64)), 0) AS {c}" for c in SOMAS_PEDIDOS)}
+               {_coluna_lote("people_id_conciliation", people_id)}
         FROM payvip_database.vw_order 
         WHERE created_at_gmt_minus_3 BETWEEN @start_date AND @end_date
-          AND people_id_conciliation = @people_id
+          AND {_filtro_people("people_id_conciliation", people_id)}
+        GROUP BY dia, {", ".join(DIMENSOES_PEDIDOS)}{_agrupar_lote(people_id)}
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", start_date),
-            bigquery.ScalarQueryParameter("end_date", "TIMESTAMP", end_date),
-            bigquery.ScalarQueryParameter("people_id", "STRING", people_id),
-        ]
-    )
-    df_orders = client.query(query, job_config=job_config).to_dataframe()
-    return df_orders
+    return _executar("rollup_pedidos", query, people_id, start_date, end_date)
+
+
+# A Gestão de Pedidos aceita períodos de até LIMITE_DIAS_GESTAO dias. O pedido de um
+# item do período está, portanto, a no máximo essa distância do item: é a janela em
+# que o BigQuery procura o pedido no join (o filtro exato fica em rollup.faturamento_itens).
+LIMITE_DIAS_GESTAO = 180
 
 
-@st.cache_data
-def dados_pedidos_itens_total(people_id, start_date, end_date):
-    """Busca todos os itens de pedidos no período."""
-    query = """
-        SELECT oi.*, p.alias_name
+def _consultar_rollup_itens_pedidos(people_id, start_date, end_date):
+    query = f"""
+        SELECT DATE(oi.created_at_gmt_minus_3) AS dia, DATE(o.created_at_gmt_minus_3) AS dia_pedido,
+               p.alias_name, oi.description,
+               COUNT(*) AS quantidade,
+               COALESCE(SUM(SAFE_CAST(oi.value_discount AS FLOAT64)), 0) AS valor
+               {_coluna_lote("oi.responsible_id", people_id)}
         FROM payvip_database.vw_order_itens AS oi
+        JOIN payvip_database.vw_order AS o
+          ON o.document_id = oi.document_id
         LEFT JOIN `payvip_database.vw_peoples` AS p
           ON oi.people_id = p.people_id
-        WHERE oi.responsible_id = @people_id
+        WHERE {_filtro_people("oi.responsible_id", people_id)}
           AND oi.created_at_gmt_minus_3 BETWEEN @start_date AND @end_date
+          AND o.people_id_conciliation = {"oi.responsible_id" if _em_lote(people_id) else "@people_id"}
+          AND o.status = 'PGCON'
+          AND o.created_at_gmt_minus_3 BETWEEN TIMESTAMP_SUB(@start_date, INTERVAL {LIMITE_DIAS_GESTAO} DAY)
+                                           AND TIMESTAMP_ADD(@end_date, INTERVAL {LIMITE_DIAS_GESTAO} DAY)
+        GROUP BY dia, {", ".join(DIMENSOES_ITENS)}{_agrupar_lote(people_id)}
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", start_date),
-            bigquery.ScalarQueryParameter("end_date", "TIMESTAMP", end_date),
-            bigquery.ScalarQueryParameter("people_id", "STRING", people_id),
-        ]
-    )
-    df_orders_itens_total = client.query(query, job_config=job_config).to_dataframe()
-    return df_orders_itens_total
+    return _executar("rollup_itens_pedidos", query, people_id, start_date, end_date)
 
 
-@st.cache_data
-def dados_transacoes(people_id, start_date, end_date):
-    """Busca todas as transações no período."""
-    query = """
-        SELECT *
+def _consultar_rollup_transacoes(people_id, start_date, end_date):
+    query = f"""
+        SELECT DATE(created_at_gmt_minus_3) AS dia, {", ".join(DIMENSOES_TRANSACOES)},
+               COUNT(*) AS quantidade,
+               COALESCE(SUM(SAFE_CAST(amount AS FLOAT64)), 0) AS valor
+               {_coluna_lote("people_id_conciliation", people_id)}
         FROM payvip_database.vw_transactions_split
+        WHERE created_at_gmt_minus_3 BETWEEN @start_date AND @end_date
+          AND {_filtro_people("people_id_conciliation", people_id)}
+        GROUP BY dia, {", ".join(DIMENSOES_TRANSACOES)}{_agrupar_lote(people_id)}
+    """
+    return _executar("rollup_transacoes", query, people_id, start_date, end_date)
+
+
+# Colunas exibidas na lista de transações da aba Vendas
+COLUNAS_LISTA_TRANSACOES = ["transaction_id", "created_at_gmt_minus_3", "status", "product_name",
+                            "customer_document", "product_capture", "amount"]
+
+# Filtro de cliente (substring, sem diferenciar maiúsculas e acentos) e cursor de
+# paginação por keyset: a página seguinte começa depois da última linha (data, id)
+# da atual. O nome é comparado como busca.normalizar_texto o deixa (decomposto, em
+# minúsculas, sem as marcas de acento), e @filtro já chega normalizado: a busca dá o
+# mesmo resultado aqui e no índice em memória (IndiceBusca).
+_FILTRO_TRANSACOES = r"""
         WHERE created_at_gmt_minus_3 BETWEEN @start_date AND @end_date
           AND people_id_conciliation = @people_id
           AND seller_principal = 'S'
+          AND (@filtro = ''
+               OR STRPOS(REGEXP_REPLACE(NORMALIZE_AND_CASEFOLD(product_name, NFKD), r'\p{M}', ''), @filtro) > 0)
+"""
+
+
+def _consultar_contagem_transacoes(people_id, start_date, end_date, filtro):
+    query = f"""
+        SELECT COUNT(*) AS quantidade
+        FROM payvip_database.vw_transactions_split
+        {_FILTRO_TRANSACOES}
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", start_date),
-            bigquery.ScalarQueryParameter("end_date", "TIMESTAMP", end_date),
-            bigquery.ScalarQueryParameter("people_id", "STRING", people_id),
-        ]
-    )
-    df_transactions = client.query(query, job_config=job_config).to_dataframe()
-    return df_transactions
+    df = _executar("contagem_transacoes", query, people_id, start_date, end_date,
+                   ("filtro", "STRING", filtro))
+    return int(df['quantidade'].iloc[0]) if not df.empty else 0
+
+
+def _consultar_pagina_transacoes(people_id, start_date, end_date, filtro, cursor, tamanho):
+    query = f"""
+        SELECT {", ".join(COLUNAS_LISTA_TRANSACOES)}
+        FROM payvip_database.vw_transactions_split
+        {_FILTRO_TRANSACOES}
+          AND (@cursor_data IS NULL
+               OR created_at_gmt_minus_3 < @cursor_data
+               OR (created_at_gmt_minus_3 = @cursor_data AND CAST(transaction_id AS STRING) < @cursor_id))
+        ORDER BY created_at_gmt_minus_3 DESC, CAST(transaction_id AS STRING) DESC
+        LIMIT @tamanho
+    """
+    cursor_data, cursor_id = cursor if cursor is not None else (None, None)
+    return _executar("pagina_transacoes", query, people_id, start_date, end_date,
+                     ("filtro", "STRING", filtro),
+                     ("cursor_data", "TIMESTAMP", cursor_data),
+                     ("cursor_id", "STRING", cursor_id),
+                     ("tamanho", "INT64", tamanho))
+
+
+# --- FUNÇÕES DE BUSCA DE DADOS (COM CACHE) ---
+# O cache é feito por segmentos diários de cada people_id: um novo período
+# reaproveita todos os dias já buscados e só consulta o BigQuery para os dias
+# que faltam (e para o dia atual, que está sempre sujeito a novos dados).
+
+# Com PAYVIP_CACHE_DIR definido, os dias fechados também vão para arquivos Arrow
+# nesse diretório, compartilhados entre processos e preservados entre reinícios.
+DIRETORIO_CACHE_DISCO = os.environ.get("PAYVIP_CACHE_DIR")
+
+# Cache por chave exata (lista de transações, painel do KPI; ver abaixo). Parte das
+# entradas é montada a partir dos segmentos: o preenchimento em lote as invalida.
+cache_consultas = CacheLimitado(limite_bytes=64 * 1024 * 1024)
+registrar_fonte_estatisticas("consultas", cache_consultas.estatisticas)
+
+cache_segmentos = CacheSegmentos(
+    disco=CacheDisco(DIRETORIO_CACHE_DISCO, idade_maxima=TTL_PERIODO_FECHADO) if DIRETORIO_CACHE_DISCO else None,
+    derivados=[cache_consultas])
+registrar_fonte_estatisticas("segmentos", cache_segmentos.estatisticas)
+
+
+def _versao(nome, *partes):
+    """Nome da consulta no cache, com um hash das colunas: mudar a projeção invalida o cache em disco."""
+    return f"{nome}-{hashlib.sha1('|'.join(partes).encode()).hexdigest()[:8]}"
+
+
+CONSULTA_TRANSACOES = _versao("transacoes", _select("vw_transactions_split"))
+CONSULTA_ROLLUP_PEDIDOS = _versao("rollup_pedidos", *DIMENSOES_PEDIDOS, *SOMAS_PEDIDOS)
+CONSULTA_ROLLUP_TRANSACOES = _versao("rollup_transacoes", *DIMENSOES_TRANSACOES)
+CONSULTA_ROLLUP_ITENS_PEDIDOS = _versao("rollup_itens_pedidos", *DIMENSOES_ITENS)
+
+
+def dados_transacoes(people_id, start_date, end_date):
+    """Busca todas as transações no período."""
+    return cache_segmentos.obter(CONSULTA_TRANSACOES, people_id, start_date, end_date, _consultar_transacoes)
+
+
+# --- LISTA PAGINADA DE TRANSAÇÕES (COM CACHE) ---
+# A lista da aba Vendas busca no BigQuery só a página exibida e a contagem total,
+# com o filtro de cliente aplicado na própria query. Os resultados ficam num cache
+# por chave exata (cache_consultas), com TTL curto quando o período inclui o dia atual.
+
+
+chamadas_consultas = ChamadaUnica("consultas")
+
+
+def _em_cache(chave, end_date, buscar):
+    valor = cache_consultas.obter(chave)
+    contar("consultas_cache", consulta=chave[0], resultado="acerto" if valor is not None else "falta")
+    if valor is None:
+        # Chamadas simultâneas com a mesma chave esperam pela primeira, que grava no cache.
+        # A falta já foi contada acima: a nova conferência não entra nas estatísticas.
+        def buscar_e_guardar():
+            resultado = cache_consultas.obter(chave, contabilizar=False)
+            if resultado is not None:
+                return resultado
+            resultado = buscar()
+            cache_consultas.guardar(chave, resultado, ttl=ttl_do_periodo(end_date))
+            return resultado
+
+        valor = chamadas_consultas.executar(chave, buscar_e_guardar)
+    return valor
+
+
+def contagem_transacoes(people_id, start_date, end_date, filtro=""):
+    """Quantidade de transações do período que atendem ao filtro de cliente."""
+    filtro = normalizar_texto(filtro)
+    return _em_cache(("contagem_transacoes", people_id, start_date, end_date, filtro), end_date,
+                     lambda: _consultar_contagem_transacoes(people_id, start_date, end_date, filtro))
+
+
+def pagina_transacoes(people_id, start_date, end_date, filtro="", cursor=None, tamanho=20):
+    """Uma página da lista de transações, da mais recente para a mais antiga.
+
+    `cursor` é o par (created_at_gmt_minus_3, transaction_id) da última linha da
+    página anterior, ou None para a primeira página. Use `cursor_da_pagina` para
+    obtê-lo a partir de uma página já buscada.
+    """
+    filtro = normalizar_texto(filtro)
+    return _em_cache(("pagina_transacoes", people_id, start_date, end_date, filtro, cursor, tamanho), end_date,
+                     lambda: _consultar_pagina_transacoes(people_id, start_date, end_date, filtro, cursor, tamanho))
+
+
+def cursor_da_pagina(df_pagina):
+    """Cursor de keyset que aponta para a página seguinte a `df_pagina`."""
+    if df_pagina.empty:
+        return None
+    ultima = df_pagina.iloc[-1]
+    return ultima['created_at_gmt_minus_3'].to_pydatetime(), str(ultima['transaction_id'])
+
+
+def lista_transacoes_em_memoria(people_id, start_date, end_date):
+    """Transações do período na ordem da lista, com o índice de busca por cliente.
+
+    Alternativa à paginação no BigQuery para períodos pequenos: o índice é montado
+    uma vez junto com os dados e cada tecla digitada no filtro vira uma consulta ao
+    índice, sem nova query. Retorna (df_lista, IndiceBusca).
+    """
+    def montar():
+        df = dados_transacoes(people_id, start_date, end_date)
+        df_lista = df[COLUNAS_LISTA_TRANSACOES].sort_values(
+            ["created_at_gmt_minus_3", "transaction_id"], ascending=False, ignore_index=True,
+            key=lambda coluna: coluna.astype(str) if coluna.name == "transaction_id" else coluna)
+        return df_lista, IndiceBusca(df_lista["product_name"])
+
+    return _em_cache(("lista_transacoes", people_id, start_date, end_date), end_date, montar)
+
+
+# --- ROLLUPS DIÁRIOS (COM CACHE) ---
+# Agregados por dia de cada people_id (quantidade e soma por dimensão), feitos no
+# BigQuery e guardados no cache de segmentos: a cada novo dia, só ele é agregado.
+# Servem os indicadores e gráficos de Vendas e de Gestão de Pedidos e os totais do
+# KPI (ver functions/rollup.py).
+
+def rollup_pedidos(people_id, start_date, end_date):
+    """Pedidos por dia e status: quantidade e somas de total_amount (valor), value, value_paid, value_pending e total_split."""
+    return cache_segmentos.obter(CONSULTA_ROLLUP_PEDIDOS, people_id, start_date, end_date,
+                                 _consultar_rollup_pedidos, coluna_data="dia")
+
+
+def rollup_transacoes(people_id, start_date, end_date):
+    """Transações por dia, status, product_capture, entry_mode e seller_principal: quantidade e soma de amount."""
+    return cache_segmentos.obter(CONSULTA_ROLLUP_TRANSACOES, people_id, start_date, end_date,
+                                 _consultar_rollup_transacoes, coluna_data="dia")
+
+
+def rollup_itens_pedidos(people_id, start_date, end_date):
+    """Itens de pedidos concluídos por dia, dia do pedido, profissional e produto: quantidade e soma de value_discount."""
+    return cache_segmentos.obter(CONSULTA_ROLLUP_ITENS_PEDIDOS, people_id, start_date, end_date,
+                                 _consultar_rollup_itens_pedidos, coluna_data="dia")
 
 
 # --- FUNÇÕES ORQUESTRADORAS (SEM CACHE) ---
 # Estas funções não precisam de cache, pois as funções que elas chamam já estão cacheadas.
-# Elas apenas organizam as chamadas de dados para cada aba.
+# Elas apenas organizam as chamadas de dados para cada aba, disparando em paralelo
+# as consultas independentes: a aba espera pela mais lenta, e não pela soma de todas.
+
+def _em_paralelo(*chamadas):
+    """Executa cada (funcao, args...) em paralelo e devolve os resultados na mesma ordem.
+
+    A primeira chamada roda na própria thread de quem pediu; as demais, num pool
+    criado só para este pedido. Um pool fixo compartilhado pelo processo limitaria
+    quantas sessões buscam dados ao mesmo tempo, justamente nos picos de acesso.
+    """
+    # Cada tarefa roda numa cópia do contexto atual, para que as métricas das
+    # consultas continuem marcadas com o people_id e a aba de quem as disparou
+    (funcao, *args), outras = chamadas[0], chamadas[1:]
+    if not outras:
+        return (funcao(*args),)
+    with ThreadPoolExecutor(max_workers=len(outras), thread_name_prefix="fc_dash_vendas") as executor:
+        futuros = [executor.submit(contextvars.copy_context().run, f, *a) for f, *a in outras]
+        primeiro = funcao(*args)
+        return (primeiro, *(futuro.result() for futuro in futuros))
+
 
 def dados_dashboard_principal(people_id, start_date, end_date):
-    """Prepara os dados para a aba principal de Vendas."""
-    # Usa a função que busca todos os status de pedidos
-    df_pedidos = dados_pedidos_total(people_id, start_date, end_date)
-    df_transacoes = dados_transacoes(people_id, start_date, end_date)
-    return df_pedidos, df_transacoes
+    """Prepara os dados para a aba principal de Vendas: os rollups diários de pedidos e transações."""
+    with medir("busca_dados", funcao="dados_dashboard_principal"):
+        df_rollup_pedidos, df_rollup_transacoes = _em_paralelo(
+            (rollup_pedidos, people_id, start_date, end_date),
+            (rollup_transacoes, people_id, start_date, end_date),
+        )
+    return df_rollup_pedidos, df_rollup_transacoes
 
 
 def dados_kpi(people_id, year_date):
-    """Prepara os dados para a aba de KPI (ano inteiro)."""
+    """Prepara os dados para a aba de KPI (ano inteiro), já agregados por mês.
+
+    Retorna dois DataFrames (GMV e TPV) com as colunas `mes`, `quantidade` e `valor`.
+    """
     start_date = f"{year_date}-01-01 00:00:00"
     end_date = f"{year_date}-12-31 23:59:59"
 
-    # Usa a função que busca todos os status de pedidos
-    df_pedidos = dados_pedidos_total(people_id, start_date, end_date)
-    df_transacoes = dados_transacoes(people_id, start_date, end_date)
-    return df_pedidos, df_transacoes
+    # GMV considera os pedidos de todos os status; TPV, as transações do seller principal
+    with medir("busca_dados", funcao="dados_kpi"):
+        df_rollup_pedidos, df_rollup_transacoes = _em_paralelo(
+            (rollup_pedidos, people_id, start_date, end_date),
+            (rollup_transacoes, people_id, start_date, end_date),
+        )
+    return totais_mensais(df_rollup_pedidos), totais_mensais(transacoes_principais(df_rollup_transacoes))
 
 
 def dados_gestao_pedidos(people_id, start_date, end_date):
-    """Prepara os dados para a aba de Gestão de Pedidos."""
-    # Usa a função que busca todos os status de pedidos
-    df_pedidos = dados_pedidos_total(people_id, start_date, end_date)
-    df_itens_pedido = dados_pedidos_itens_total(people_id, start_date, end_date)
-    return df_pedidos, df_itens_pedido
+    """Prepara os dados para a aba de Gestão de Pedidos: os rollups diários de pedidos e de itens.
+
+    O cruzamento dos itens com o status do pedido e os agrupamentos por profissional
+    e produto são feitos no BigQuery; a aba recebe só os totais (ver functions/rollup.py).
+    """
+    with medir("busca_dados", funcao="dados_gestao_pedidos"):
+        df_rollup_pedidos, df_rollup_itens = _em_paralelo(
+            (rollup_pedidos, people_id, start_date, end_date),
+            (rollup_itens_pedidos, people_id, start_date, end_date),
+        )
+    return df_rollup_pedidos, df_rollup_itens
+
+
+# --- PAINEL DO KPI (COM CACHE) ---
+# Todos os meses do ano calculados de uma vez (ver rollup.painel_kpi) e guardados no
+# cache de consultas: trocar o mês na aba KPI não recalcula nada. O TTL segue o do
+# ano, curto enquanto o ano ainda recebe dados; mudar as metas muda a chave.
+
+def dados_painel_kpi(people_id, ano, gmv_metas, tpv_metas):
+    """Indicadores do KPI por mês ({mes: indicadores}), ou {} se o ano não tiver dados."""
+    def montar():
+        df_gmv_mensal, df_tpv_mensal = dados_kpi(people_id, str(ano))
+        if df_gmv_mensal.empty or df_tpv_mensal.empty:
+            return {}
+        return painel_kpi(ano, df_gmv_mensal, df_tpv_mensal, gmv_metas, tpv_metas)
+
+    chave = ("painel_kpi", people_id, ano, tuple(sorted(gmv_metas.items())), tuple(sorted(tpv_metas.items())))
+    return _em_cache(chave, f"{ano}-12-31 23:59:59", montar)
+
+
+# --- PREENCHIMENTO EM LOTE (VÁRIOS people_ids) ---
+# Uma query por consulta para uma lista de people_ids, em vez de uma por people_id:
+# o custo fixo de cada job e a leitura das partições do período são pagos uma vez.
+# O resultado é dividido por people_id e por dia e gravado no cache de segmentos
+# (memória e, com PAYVIP_CACHE_DIR, disco), como se cada um tivesse consultado.
+# Usado no aquecimento ao subir o processo (prefetch) e no job agendado
+# functions/prefetch_lote.py.
+
+# nome -> (nome no cache, função de consulta, coluna de data): as consultas lidas pelas abas.
+CONSULTAS_LOTE = {
+    "rollup_pedidos": (CONSULTA_ROLLUP_PEDIDOS, _consultar_rollup_pedidos, "dia"),
+    "rollup_transacoes": (CONSULTA_ROLLUP_TRANSACOES, _consultar_rollup_transacoes, "dia"),
+    "rollup_itens_pedidos": (CONSULTA_ROLLUP_ITENS_PEDIDOS, _consultar_rollup_itens_pedidos, "dia"),
+    "transacoes": (CONSULTA_TRANSACOES, _consultar_transacoes, COLUNA_DATA),
+}
+
+# people_ids por query: limita o tamanho de cada resultado baixado de uma vez
+MAX_PEOPLE_IDS_POR_LOTE = 200
+
+
+def preencher_em_lote(people_ids, start_date, end_date, consultas=None, tamanho_lote=MAX_PEOPLE_IDS_POR_LOTE):
+    """Busca o período de vários people_ids com uma query por consulta e grava no cache de segmentos.
+
+    `consultas` são nomes de CONSULTAS_LOTE (todas, se não informado). Retorna o
+    número de linhas recebidas por consulta.
+    """
+    people_ids = sorted(set(people_ids))
+    linhas = {}
+    for nome in (consultas or CONSULTAS_LOTE):
+        consulta, buscar, coluna_data = CONSULTAS_LOTE[nome]
+        linhas[nome] = 0
+        for i in range(0, len(people_ids), tamanho_lote):
+            lote = people_ids[i:i + tamanho_lote]
+            with medir("preencher_lote", consulta=nome) as evento:
+                df = buscar(lote, start_date, end_date)
+                partes = {people_id: parte.drop(columns=COLUNA_LOTE).reset_index(drop=True)
+                          for people_id, parte in df.groupby(COLUNA_LOTE, sort=False)}
+                # people_ids sem nenhuma linha no período também ficam em cache (dias vazios)
+                vazio = df.iloc[0:0].drop(columns=COLUNA_LOTE)
+                for people_id in lote:
+                    cache_segmentos.preencher(consulta, people_id, start_date, end_date,
+                                              partes.get(people_id, vazio), coluna_data)
+                evento.update(people_ids=len(lote), linhas=len(df))
+            linhas[nome] += len(df)
+    return linhas
@@ -0,0 +1,59 @@
+# functions/fc_peoples.py
+
+import threading
+from google.cloud import firestore
+from functions.cache import CacheLimitado
+
+# Tempo que a configuração de um people_id fica em cache antes de ser lida de novo
+# no Firestore. Alterações de metas aparecem em no máximo esse intervalo, ou na
+# hora, se invalidar_config_people for chamada.
+TTL_CONFIG_PEOPLE = 5 * 60
+
+_cliente_firestore = None
+_lock_cliente = threading.Lock()
+_cache_configs = CacheLimitado(limite_bytes=16 * 1024 * 1024, ttl_padrao=TTL_CONFIG_PEOPLE)
+
+
+def cliente_firestore():
+    """Cliente Firestore único por processo, criado no primeiro uso."""
+    global _cliente_firestore
+    if _cliente_firestore is None:
+        with _lock_cliente:
+            if _cliente_firestore is None:
+                _cliente_firestore = firestore.Client()
+    return _cliente_firestore
+
+
+def _parse_people(people_data):
+    """Extrai do documento `peoples/{people_id}` os flags de abas e as metas de KPI."""
+    config = {"exibe_kpi": False, "exibe_gestao_pedidos": False, "gmv_metas": {}, "tpv_metas": {}}
+    if people_data.get("kpi_control") == "S":
+        config["exibe_kpi"] = True
+        kpis_data = people_data.get('kpis', [{}])[0]
+        for item in kpis_data.get('GMV', []): config["gmv_metas"].update(item)
+        for item in kpis_data.get('TPV', []): config["tpv_metas"].update(item)
+
+    if people_data.get("dashboard_order_control") == "S":
+        config["exibe_gestao_pedidos"] = True
+    return config
+
+
+def config_people(people_id):
+    """Retorna a configuração (flags e metas) de um people_id, usando o cache com TTL.
+
+    O dicionário retornado é compartilhado entre as sessões e não deve ser alterado.
+    """
+    config = _cache_configs.obter(people_id)
+    if config is None:
+        people_doc = cliente_firestore().collection('peoples').document(people_id).get()
+        config = _parse_people(people_doc.to_dict() if people_doc.exists else {})
+        _cache_configs.guardar(people_id, config)
+    return config
+
+
+def invalidar_config_people(people_id=None):
+    """Descarta a configuração em cache de um people_id (ou de todos)."""
+    if people_id is None:
+        _cache_configs.limpar()
+    else:
+        _cache_configs.remover_onde(lambda chave: chave == people_id)
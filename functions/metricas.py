@@ -0,0 +1,148 @@
+# functions/metricas.py
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Logs estruturados (uma linha JSON por evento), no formato que o Cloud Logging
+# entende a partir do stdout do Cloud Run. PAYVIP_METRICAS_LOG=0 desliga os logs;
+# os agregados para o painel de debug e o texto Prometheus continuam sendo coletados.
+LOG_ATIVO = os.environ.get("PAYVIP_METRICAS_LOG", "1") != "0"
+
+# Só as medições de topo (render de aba, fragmento, busca do prefetch) vão sempre
+# para o log. As aninhadas (cada job, download e conversão de uma aba) entram só se
+# passarem deste limite; as demais ficam apenas nos agregados.
+# PAYVIP_METRICAS_LOG_MIN_MS=0 registra todas.
+LIMITE_LOG_ANINHADO_MS = float(os.environ.get("PAYVIP_METRICAS_LOG_MIN_MS", 100))
+
+logger = logging.getLogger("payvip.metricas")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Campos de contexto (people_id, aba) herdados por todos os eventos de uma execução,
+# inclusive nas threads das consultas paralelas (ver fc_dash_vendas._em_paralelo).
+_contexto = contextvars.ContextVar("payvip_metricas_contexto", default={})
+# Se a execução atual já está dentro de um bloco `medir`
+_aninhado = contextvars.ContextVar("payvip_metricas_aninhado", default=False)
+
+_lock = threading.Lock()
+_duracoes = {}  # (nome, rótulos) -> [quantidade, soma, máximo]
+_contadores = {}  # (nome, rótulos) -> valor
+_fontes_estatisticas = {}  # nome do cache -> função que retorna estatisticas()
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def _log(evento, campos):
+    if LOG_ATIVO:
+        logger.info(json.dumps({"severity": "INFO", "evento": evento, **_contexto.get(), **campos},
+                               default=str, ensure_ascii=False))
+
+
+@contextmanager
+def contexto(**campos):
+    """Acrescenta campos (ex.: people_id, aba) a todos os eventos registrados dentro do bloco."""
+    token = _contexto.set({**_contexto.get(), **campos})
+    try:
+        yield
+    finally:
+        _contexto.reset(token)
+
+
+@contextmanager
+def medir(nome, **rotulos):
+    """Mede a duração do bloco e registra um evento (no log, se for de topo ou lento; ver LIMITE_LOG_ANINHADO_MS).
+
+    Os `rotulos` identificam a série agregada (baixa cardinalidade: consulta, aba,
+    gráfico). O dicionário retornado aceita campos extras só para o log, como linhas
+    ou bytes processados.
+    """
+    campos = {}
+    aninhado = _aninhado.get()
+    token = _aninhado.set(True)
+    inicio = time.perf_counter()
+    try:
+        yield campos
+    finally:
+        duracao = time.perf_counter() - inicio
+        _aninhado.reset(token)
+        with _lock:
+            agregado = _duracoes.setdefault(_chave(nome, rotulos), [0, 0.0, 0.0])
+            agregado[0] += 1
+            agregado[1] += duracao
+            agregado[2] = max(agregado[2], duracao)
+        if not aninhado or duracao * 1000 >= LIMITE_LOG_ANINHADO_MS:
+            _log(nome, {"duracao_ms": round(duracao * 1000, 2), **rotulos, **campos})
+
+
+def contar(nome, valor=1, **rotulos):
+    """Soma `valor` a um contador (ex.: bytes processados, linhas retornadas)."""
+    with _lock:
+        chave = _chave(nome, rotulos)
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def registrar_fonte_estatisticas(nome, funcao):
+    """Registra um cache cuja função `estatisticas()` entra no painel e no texto Prometheus."""
+    _fontes_estatisticas[nome] = funcao
+
+
+def resumo():
+    """Agregados atuais: durações por série, contadores e estatísticas dos caches."""
+    with _lock:
+        duracoes = [{"nome": nome, **dict(rotulos), "quantidade": qtd, "media_ms": round(soma / qtd * 1000, 2),
+                     "max_ms": round(maximo * 1000, 2), "total_s": round(soma, 3)}
+                    for (nome, rotulos), (qtd, soma, maximo) in _duracoes.items()]
+        contadores = [{"nome": nome, **dict(rotulos), "valor": valor}
+                      for (nome, rotulos), valor in _contadores.items()]
+    caches = {}
+    for nome, funcao in _fontes_estatisticas.items():
+        estatisticas = funcao()
+        consultas = estatisticas["acertos"] + estatisticas["faltas"]
+        caches[nome] = dict(estatisticas, taxa_acerto=round(estatisticas["acertos"] / consultas, 4) if consultas else 0)
+    return {"duracoes": duracoes, "contadores": contadores, "caches": caches}
+
+
+def limpar():
+    """Zera as durações e os contadores acumulados (as fontes de estatísticas continuam registradas)."""
+    with _lock:
+        _duracoes.clear()
+        _contadores.clear()
+
+
+def _rotulos_prometheus(rotulos):
+    if not rotulos:
+        return ""
+    texto = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for k, v in rotulos)
+    return "{" + texto + "}"
+
+
+def exportar_prometheus():
+    """Métricas no formato texto do Prometheus."""
+    linhas = ["# TYPE payvip_duracao_segundos summary"]
+    with _lock:
+        duracoes = list(_duracoes.items())
+        contadores = list(_contadores.items())
+    for (nome, rotulos), (qtd, soma, _) in duracoes:
+        serie = _rotulos_prometheus((("span", nome),) + rotulos)
+        linhas.append(f"payvip_duracao_segundos_count{serie} {qtd}")
+        linhas.append(f"payvip_duracao_segundos_sum{serie} {soma:.6f}")
+    linhas.append("# TYPE payvip_contador_total counter")
+    for (nome, rotulos), valor in contadores:
+        linhas.append(f"payvip_contador_total{_rotulos_prometheus((('nome', nome),) + rotulos)} {valor}")
+    for nome, funcao in _fontes_estatisticas.items():
+        for chave, valor in funcao().items():
+            linhas.append(f"payvip_cache_{chave}{_rotulos_prometheus((('cache', nome),))} {valor}")
+    return "\n".join(linhas) + "\n"
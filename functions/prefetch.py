@@ -0,0 +1,135 @@
+# functions/prefetch.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from streamlit.runtime import Runtime
+
+# Pool próprio e pequeno para o aquecimento do cache em segundo plano. Cada tarefa
+# chama uma única busca com cache (um rollup) e roda na própria thread do pool: o
+# prefetch tem no máximo MAX_WORKERS_PREFETCH consultas em andamento e não ocupa
+# threads das buscas das abas. Ainda usa a mesma cota do BigQuery que os usuários.
+MAX_WORKERS_PREFETCH = 2
+
+# people_ids de maior tráfego a aquecer quando o processo sobe (separados por vírgula).
+# O aquecimento roda dentro do servidor do Streamlit e divide cada resultado em
+# segmentos por dia: a query é barata, mas montar e guardar os segmentos é CPU
+# Python, que disputa o GIL com os primeiros usuários (no cliente falso, ~0,5 ms por
+# segmento: 200 people_ids x 290 dias x 3 rollups passam de 1 minuto). Por isso, o
+# aquecimento se limita aos MAX_PEOPLE_IDS_AQUECIMENTO primeiros da lista e aos
+# meses padrão de Vendas e Gestão de Pedidos, o atual e o anterior (~3 s no total).
+# Listas maiores e o ano do KPI ficam para o job functions/prefetch_lote.py, que
+# roda fora do servidor e grava no cache em disco (PAYVIP_CACHE_DIR).
+PEOPLE_IDS_AQUECIMENTO = [p.strip() for p in os.environ.get("PAYVIP_PREFETCH_PEOPLE_IDS", "").split(",")
+                          if p.strip()]
+MAX_PEOPLE_IDS_AQUECIMENTO = 20
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS_PREFETCH, thread_name_prefix="prefetch")
+_agendados = {}  # session_id -> futures ainda pendentes (a entrada sai quando todos terminam)
+_lock = threading.Lock()
+_aquecimento_iniciado = False
+
+
+def _periodo(data_inicio, data_fim):
+    """Strings de início e fim no mesmo formato usado pelas abas."""
+    return (datetime.combine(data_inicio, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S'),
+            datetime.combine(data_fim, datetime.max.time()).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def tarefas_prefetch(people_id, exibe_kpi=True, exibe_gestao_pedidos=True):
+    """Buscas mais prováveis depois da primeira tela: KPI do ano, mês anterior e Gestão de Pedidos.
+
+    São os rollups que dados_kpi, dados_gestao_pedidos e dados_dashboard_principal
+    leem, com os mesmos períodos das abas, chamados um a um: as funções das abas
+    disparariam threads extras (_em_paralelo) para cada tarefa do prefetch.
+    """
+    from functions.fc_dash_vendas import rollup_itens_pedidos, rollup_pedidos, rollup_transacoes
+
+    hoje = datetime.now().date()
+    primeiro_dia_mes = hoje.replace(day=1)
+    ultimo_dia_mes_anterior = primeiro_dia_mes - timedelta(days=1)
+
+    tarefas = []
+    if exibe_kpi:
+        ano = (f"{hoje.year}-01-01 00:00:00", f"{hoje.year}-12-31 23:59:59")  # como em dados_kpi
+        tarefas += [(rollup_pedidos, people_id, *ano), (rollup_transacoes, people_id, *ano)]
+    if exibe_gestao_pedidos:
+        mes_atual = _periodo(primeiro_dia_mes, hoje)
+        tarefas += [(rollup_pedidos, people_id, *mes_atual), (rollup_itens_pedidos, people_id, *mes_atual)]
+    mes_anterior = _periodo(ultimo_dia_mes_anterior.replace(day=1), ultimo_dia_mes_anterior)
+    tarefas += [(rollup_pedidos, people_id, *mes_anterior), (rollup_transacoes, people_id, *mes_anterior)]
+    return tarefas
+
+
+def _sessao_ativa(sessao):
+    return sessao is None or (Runtime.exists() and Runtime.instance().is_active_session(sessao))
+
+
+def _executar(sessao, funcao, *args):
+    # Tarefas de uma sessão encerrada são descartadas antes de consultar o BigQuery
+    if not _sessao_ativa(sessao):
+        cancelar_prefetch(sessao)
+        return
+    try:
+        funcao(*args)
+    except Exception:
+        # O prefetch é só uma otimização: erros aparecem quando a aba buscar de verdade
+        pass
+
+
+def _liberar(sessao, futuros):
+    """Tira a sessão de _agendados quando todas as suas tarefas terminam (ou são canceladas).
+
+    Sessões encerradas sem cancelar_prefetch (aba fechada, timeout) não deixam
+    futures nem resultados presos no processo.
+    """
+    if all(futuro.done() for futuro in futuros):
+        with _lock:
+            if _agendados.get(sessao) is futuros:
+                del _agendados[sessao]
+
+
+def agendar_prefetch(sessao, people_id, exibe_kpi=True, exibe_gestao_pedidos=True):
+    """Agenda o aquecimento do cache para a sessão, se ela já não tiver tarefas pendentes."""
+    with _lock:
+        if sessao in _agendados:
+            return
+        futuros = [_executor.submit(_executar, sessao, *tarefa)
+                   for tarefa in tarefas_prefetch(people_id, exibe_kpi, exibe_gestao_pedidos)]
+        _agendados[sessao] = futuros
+    # Fora do lock: o callback roda na hora se o future já tiver terminado
+    for futuro in futuros:
+        futuro.add_done_callback(lambda _, sessao=sessao, futuros=futuros: _liberar(sessao, futuros))
+
+
+def cancelar_prefetch(sessao):
+    """Cancela as tarefas ainda na fila de uma sessão."""
+    with _lock:
+        futuros = _agendados.pop(sessao, [])
+    for futuro in futuros:
+        futuro.cancel()
+
+
+def aquecer_inicializacao(people_ids=None):
+    """Aquece o cache dos primeiros people_ids de PAYVIP_PREFETCH_PEOPLE_IDS, uma vez por processo."""
+    global _aquecimento_iniciado
+    with _lock:
+        if _aquecimento_iniciado:
+            return
+        _aquecimento_iniciado = True
+    people_ids = (PEOPLE_IDS_AQUECIMENTO if people_ids is None else people_ids)[:MAX_PEOPLE_IDS_AQUECIMENTO]
+    if not people_ids:
+        return
+    from functions.cache import hoje
+    from functions.fc_dash_vendas import preencher_em_lote
+
+    # Rollups de todos os people_ids numa query por consulta (e não uma por people_id),
+    # do início do mês anterior até hoje, no fuso dos dados: cobrem os períodos padrão
+    # de Vendas e Gestão de Pedidos. Dias futuros não têm dados, e a lista de
+    # transações e o ano do KPI ficam para as abas (ou para o cache em disco).
+    dia_atual = hoje()
+    inicio = (dia_atual.replace(day=1) - timedelta(days=1)).replace(day=1)
+    _executor.submit(_executar, None, preencher_em_lote, people_ids, *_periodo(inicio, dia_atual),
+                     ["rollup_pedidos", "rollup_transacoes", "rollup_itens_pedidos"])
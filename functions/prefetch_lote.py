@@ -0,0 +1,87 @@
+# functions/prefetch_lote.py
+"""Job agendado que preenche o cache em disco de vários people_ids antes do expediente.
+
+Roda com a mesma imagem do dashboard (por exemplo, como Cloud Run Job disparado
+pelo Cloud Scheduler de madrugada) e com o mesmo PAYVIP_CACHE_DIR das instâncias,
+num volume compartilhado. Para cada consulta das abas, faz uma única query para
+todos os people_ids (em lotes de até MAX_PEOPLE_IDS_POR_LOTE) e grava os dias
+fechados do período no cache em disco: durante o dia, as abas só vão ao BigQuery
+para o dia atual.
+
+Uso, na raiz do projeto:
+    python -m functions.prefetch_lote --people-ids id1 id2 id3
+    python -m functions.prefetch_lote --arquivo people_ids.txt --inicio 2025-01-01
+    python -m functions.prefetch_lote   # people_ids de PAYVIP_PREFETCH_PEOPLE_IDS
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from functions.cache import hoje
+from functions.fc_dash_vendas import CONSULTAS_LOTE, DIRETORIO_CACHE_DISCO, MAX_PEOPLE_IDS_POR_LOTE, \
+    preencher_em_lote
+from functions.metricas import medir
+
+
+def periodo_padrao():
+    """Do início do ano (ou do mês anterior, se ele for do ano passado) até ontem.
+
+    Cobre o KPI do ano e os períodos padrão de Vendas e Gestão de Pedidos. O dia
+    atual fica de fora: ainda recebe dados e não vai para o disco.
+    """
+    dia_atual = hoje()
+    inicio_mes_anterior = (dia_atual.replace(day=1) - timedelta(days=1)).replace(day=1)
+    inicio = min(dia_atual.replace(month=1, day=1), inicio_mes_anterior)
+    return inicio, dia_atual - timedelta(days=1)
+
+
+def _ler_people_ids(args):
+    people_ids = list(args.people_ids or [])
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as arquivo:
+            people_ids.extend(linha.strip() for linha in arquivo if linha.strip())
+    if not people_ids:
+        people_ids = [p.strip() for p in os.environ.get("PAYVIP_PREFETCH_PEOPLE_IDS", "").split(",") if p.strip()]
+    return people_ids
+
+
+def _data(texto):
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def main(argumentos=None):
+    inicio_padrao, fim_padrao = periodo_padrao()
+    parser = argparse.ArgumentParser(description="Preenche o cache em disco de vários people_ids de uma vez.")
+    parser.add_argument("--people-ids", nargs="+", help="people_ids a preencher")
+    parser.add_argument("--arquivo", help="arquivo com um people_id por linha")
+    parser.add_argument("--inicio", type=_data, default=inicio_padrao, help="primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=_data, default=fim_padrao, help="último dia (AAAA-MM-DD, padrão: ontem)")
+    parser.add_argument("--consultas", nargs="+", choices=list(CONSULTAS_LOTE), default=list(CONSULTAS_LOTE),
+                        help="consultas a preencher (padrão: todas)")
+    parser.add_argument("--tamanho-lote", type=int, default=MAX_PEOPLE_IDS_POR_LOTE,
+                        help="people_ids por query")
+    args = parser.parse_args(argumentos)
+
+    if not DIRETORIO_CACHE_DISCO:
+        print("PAYVIP_CACHE_DIR não definido: sem o cache em disco, o job não deixa nada para as instâncias.",
+              file=sys.stderr)
+        return 2
+    people_ids = _ler_people_ids(args)
+    if not people_ids:
+        print("Nenhum people_id informado (--people-ids, --arquivo ou PAYVIP_PREFETCH_PEOPLE_IDS).", file=sys.stderr)
+        return 2
+
+    start_date = datetime.combine(args.inicio, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S')
+    end_date = datetime.combine(args.fim, datetime.max.time()).strftime('%Y-%m-%d %H:%M:%S')
+    with medir("prefetch_lote") as evento:
+        evento["people_ids"] = len(people_ids)
+        linhas = preencher_em_lote(people_ids, start_date, end_date, args.consultas, args.tamanho_lote)
+    for nome, quantidade in linhas.items():
+        print(f"{nome}: {quantidade:,} linhas para {len(people_ids)} people_ids ({args.inicio} a {args.fim})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# functions/rollup.py
+
+import numpy as np
+import pandas as pd
+
+# Dimensões dos agregados diários (rollups) buscados em fc_dash_vendas. Cada linha
+# de um rollup é (dia, dimensões..., quantidade, valor) de um people_id; os dias são
+# guardados no cache de segmentos, então só os dias novos são agregados de novo.
+# Todas as métricas abaixo são calculadas sobre essas linhas, e não sobre as
+# transações: o custo depende do número de dias (e combinações), não de vendas.
+DIMENSOES_TRANSACOES = ["status", "product_capture", "entry_mode", "seller_principal"]
+DIMENSOES_PEDIDOS = ["status"]
+# Além de quantidade e valor (total_amount), o rollup de pedidos soma as colunas
+# usadas pelos indicadores da Gestão de Pedidos
+SOMAS_PEDIDOS = ["value", "value_paid", "value_pending", "total_split"]
+# Itens de pedidos concluídos por dia do item, dia do pedido, profissional e produto
+DIMENSOES_ITENS = ["dia_pedido", "alias_name", "description"]
+
+
+def transacoes_principais(rollup_transacoes):
+    """Linhas do seller principal, as mesmas que a aba Vendas sempre considerou."""
+    return rollup_transacoes[rollup_transacoes['seller_principal'] == 'S']
+
+
+def _aprovadas(rollup_transacoes):
+    principais = transacoes_principais(rollup_transacoes)
+    return principais[principais['status'] == 'Aprovada']
+
+
+def resumo_vendas(rollup_pedidos, rollup_transacoes):
+    """Indicadores do topo da aba Vendas."""
+    aprovadas = _aprovadas(rollup_transacoes)
+    total_transacoes = int(aprovadas['quantidade'].sum())
+    vendas_aprovadas = aprovadas['valor'].sum()
+    vendas_payvip = aprovadas[aprovadas['entry_mode'] != 'outros']['valor'].sum()
+    return {
+        "total_pedidos": int(rollup_pedidos['quantidade'].sum()),
+        "transacoes_periodo": int(transacoes_principais(rollup_transacoes)['quantidade'].sum()),
+        "total_transacoes": total_transacoes,
+        "vendas_aprovadas": vendas_aprovadas,
+        "vendas_payvip": vendas_payvip,
+        "vendas_outros": vendas_aprovadas - vendas_payvip,
+        "ticket_medio": vendas_aprovadas / total_transacoes if total_transacoes > 0 else 0,
+    }
+
+
+def metodo_simplificado(product_capture):
+    """Agrupa as formas de captura: crédito à vista, crédito parcelado e as demais como vieram."""
+    conditions = [product_capture == 'Crédito 1x', product_capture.str.startswith('Crédito', na=False)]
+    choices = ['Crédito à Vista', 'Crédito Parcelado']
+    return pd.Series(np.select(conditions, choices, default=product_capture.astype(object)),
+                     index=product_capture.index, name='metodo_simplificado')
+
+
+def vendas_por_metodo(rollup_transacoes):
+    """Valor aprovado por método simplificado (colunas metodo_simplificado, amount)."""
+    aprovadas = _aprovadas(rollup_transacoes)
+    return (aprovadas.groupby(metodo_simplificado(aprovadas['product_capture']))['valor'].sum()
+            .rename('amount').reset_index())
+
+
+def vendas_por_status(rollup_transacoes):
+    """Valor por status das transações do seller principal (colunas status, amount)."""
+    return (transacoes_principais(rollup_transacoes).groupby('status', observed=True)['valor'].sum()
+            .rename('amount').reset_index())
+
+
+def volume_diario(rollup_transacoes, data_inicio, data_fim):
+    """Valor aprovado por dia, com todos os dias do período (colunas data, valor)."""
+    aprovadas = _aprovadas(rollup_transacoes)
+    por_dia = aprovadas.groupby(aprovadas['dia'].dt.date)['valor'].sum()
+    dias = pd.date_range(start=data_inicio, end=data_fim, freq='D').date
+    return pd.DataFrame({'data': dias, 'valor': por_dia.reindex(dias, fill_value=0).to_numpy()})
+
+
+def totais_mensais(rollup):
+    """Soma um rollup (dia, ..., quantidade, valor) por mês do ano (colunas mes, quantidade, valor)."""
+    meses = rollup['dia'].dt.month.rename('mes')
+    return rollup.groupby(meses)[['quantidade', 'valor']].sum().reset_index().sort_values('mes', ignore_index=True)
+
+
+def _por_mes(totais):
+    """Quantidade e valor dos 12 meses (meses sem dados valem zero)."""
+    totais = totais.set_index('mes').reindex(range(1, 13), fill_value=0)
+    return totais['quantidade'].to_numpy(), totais['valor'].to_numpy()
+
+
+def _metas_por_mes(metas, ano):
+    """Meta de cada mês do ano e meta acumulada até ele (todas as chaves "MM/AAAA" até o mês, inclusive)."""
+    mensais, acumuladas = np.zeros(12), np.zeros(12)
+    for chave, valor in metas.items():
+        mes, ano_meta = map(int, chave.split('/'))
+        if ano_meta == ano:
+            mensais[mes - 1] += valor
+            acumuladas[mes - 1:] += valor
+        elif ano_meta < ano:
+            acumuladas += valor
+    return mensais, acumuladas
+
+
+def _aderencia(real, meta):
+    return real / meta * 100 if meta > 0 else 0
+
+
+def painel_kpi(ano, totais_gmv, totais_tpv, gmv_metas, tpv_metas):
+    """Indicadores da aba KPI para todos os meses do ano, calculados de uma vez.
+
+    Recebe os totais mensais de GMV e TPV (colunas mes, quantidade, valor) e as
+    metas {"MM/AAAA": valor}. Retorna {mes: indicadores} para mes de 1 a 12, com o
+    realizado no mês e acumulado no ano, as metas e as aderências: trocar o mês na
+    aba é só uma consulta a este dicionário.
+    """
+    painel = {mes: {} for mes in range(1, 13)}
+    for prefixo, totais, metas, rotulo_quantidade in (("gmv", totais_gmv, gmv_metas, "total_pedidos"),
+                                                        ("tpv", totais_tpv, tpv_metas, "qtd_transacoes")):
+        quantidades, valores = _por_mes(totais)
+        quantidades_acumuladas, valores_acumulados = np.cumsum(quantidades), np.cumsum(valores)
+        metas_mes, metas_acumuladas = _metas_por_mes(metas, ano)
+        for i, indicadores in enumerate(painel.values()):
+            indicadores.update({
+                f"{rotulo_quantidade}_acumulado": int(quantidades_acumuladas[i]),
+                f"{prefixo}_meta_acumulada": float(metas_acumuladas[i]),
+                f"{prefixo}_real_acumulado": float(valores_acumulados[i]),
+                f"aderencia_{prefixo}_acumulada": _aderencia(valores_acumulados[i], metas_acumuladas[i]),
+                f"{rotulo_quantidade}_mes": int(quantidades[i]),
+                f"{prefixo}_meta_mes": float(metas_mes[i]),
+                f"{prefixo}_real_mes": float(valores[i]),
+                f"aderencia_{prefixo}_mes": _aderencia(valores[i], metas_mes[i]),
+            })
+    return painel
+
+
+def resumo_gestao_pedidos(rollup_pedidos):
+    """Indicadores do topo da aba Gestão de Pedidos."""
+    por_status = rollup_pedidos.groupby('status', observed=True)[['quantidade', *SOMAS_PEDIDOS]].sum()
+    concluidos = por_status.reindex(['PGCON'], fill_value=0).iloc[0]
+    parciais = por_status.reindex(['PGPAG'], fill_value=0).iloc[0]
+    return {
+        "total_pedidos": int(rollup_pedidos['quantidade'].sum()),
+        "total_pedidos_concluidos": int(concluidos['quantidade']),
+        "valor_vendas_concluidas": concluidos['value'],
+        "total_pedidos_parciais": int(parciais['quantidade']),
+        "valor_pago_parcialmente": parciais['value_paid'],
+        "valor_pendente_receber": parciais['value_pending'],
+        "total_repassado": concluidos['total_split'] + parciais['total_split'],
+    }
+
+
+def faturamento_itens(rollup_itens, coluna, data_inicio, data_fim):
+    """Valor dos itens de pedidos concluídos por `coluna` (alias_name ou description).
+
+    Só contam os itens cujo pedido também é do período, como no cruzamento dos
+    pedidos do período com os seus itens. Colunas `coluna` e value_discount.
+    """
+    dia_pedido = rollup_itens['dia_pedido']
+    no_periodo = rollup_itens[(dia_pedido >= pd.Timestamp(data_inicio)) & (dia_pedido <= pd.Timestamp(data_fim))]
+    return no_periodo.groupby(coluna)['valor'].sum().rename('value_discount').reset_index()
@@ -1,11 +1,11 @@
 # tabs/gestao_pedidos.py
 
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from functions.fc_dash_vendas import dados_gestao_pedidos
-from tabs.utils import cores_payvip
+from functions.fc_dash_vendas import LIMITE_DIAS_GESTAO, dados_gestao_pedidos
+from functions.metricas import medir
+from functions.rollup import faturamento_itens, resumo_gestao_pedidos
+from tabs.graficos import figura_barras_horizontais
 
 # --- FUNÇÃO HELPER PARA FORMATAR VALORES DO GRÁFICO ---
 def formatar_valor_abreviado(valor):
@@ -24,17 +24,18 @@ def render(people_id):
     with col_filtro1:
         hoje = datetime.now().date()
         primeiro_dia_mes = hoje.replace(day=1)
+        # O valor inicial vai para o session_state (e não em value=), que o dashboard preserva entre as abas
+        st.session_state.setdefault("filtro_gestao_pedidos", (primeiro_dia_mes, hoje))
         datas_selecionadas = st.date_input(
             "Selecione o Período",
-            value=(primeiro_dia_mes, hoje),
             max_value=hoje,
             key="filtro_gestao_pedidos"
         )
 
     if len(datas_selecionadas) == 2:
         data_inicio, data_fim = datas_selecionadas
-        if (data_fim - data_inicio).days > 180:
-            st.error("O período selecionado não pode ser maior que 180 dias.")
+        if (data_fim - data_inicio).days > LIMITE_DIAS_GESTAO:
+            st.error(f"O período selecionado não pode ser maior que {LIMITE_DIAS_GESTAO} dias.")
             return
     else:
         data_inicio, data_fim = primeiro_dia_mes, hoje
@@ -44,7 +45,7 @@ def render(people_id):
 
     try:
         with st.spinner("Buscando dados de pedidos..."):
-            df_pedidos, df_itens_pedidos = dados_gestao_pedidos(
+            df_rollup_pedidos, df_rollup_itens = dados_gestao_pedidos(
                 people_id=people_id,
                 start_date=start_date_str,
                 end_date=end_date_str
@@ -53,24 +54,16 @@ def render(people_id):
         st.error(f"Ocorreu um erro ao buscar os dados de pedidos: {e}")
         return
 
-    if df_pedidos is not None and not df_pedidos.empty:
-        df_pedidos.columns = df_pedidos.columns.str.strip().str.lower()
-
-        value_cols = ['value', 'value_paid', 'value_pending', 'total_split']
-        for col in value_cols:
-            if col in df_pedidos.columns:
-                df_pedidos[col] = pd.to_numeric(df_pedidos[col], errors='coerce').fillna(0)
-
-        df_concluidos = df_pedidos[df_pedidos['status'] == 'PGCON'].copy()
-        df_parciais = df_pedidos[df_pedidos['status'] == 'PGPAG'].copy()
-        df_repassados = df_pedidos[df_pedidos['status'].isin(['PGCON', 'PGPAG'])].copy()
-
-        total_pedidos_concluidos = len(df_concluidos)
-        valor_vendas_concluidas = df_concluidos['value'].sum()
-        total_pedidos_parciais = len(df_parciais)
-        valor_pago_parcialmente = df_parciais['value_paid'].sum()
-        valor_pendente_receber = df_parciais['value_pending'].sum()
-        total_repassado = df_repassados['total_split'].sum()
+    # Os indicadores e os totais por profissional e produto saem dos rollups
+    # diários, agregados no BigQuery, e não dos pedidos e itens do período.
+    resumo = resumo_gestao_pedidos(df_rollup_pedidos)
+    if resumo["total_pedidos"] > 0:
+        total_pedidos_concluidos = resumo["total_pedidos_concluidos"]
+        valor_vendas_concluidas = resumo["valor_vendas_concluidas"]
+        total_pedidos_parciais = resumo["total_pedidos_parciais"]
+        valor_pago_parcialmente = resumo["valor_pago_parcialmente"]
+        valor_pendente_receber = resumo["valor_pendente_receber"]
+        total_repassado = resumo["total_repassado"]
 
         def formatar_moeda(valor):
             return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -91,81 +84,30 @@ def render(people_id):
 
         st.divider()
 
-        if df_itens_pedidos is not None and not df_itens_pedidos.empty:
-            df_itens_pedidos.columns = df_itens_pedidos.columns.str.strip().str.lower()
-            df_itens_pedidos['value_discount'] = pd.to_numeric(df_itens_pedidos['value_discount'],
-                                                               errors='coerce').fillna(0)
-
-            # <<< CORREÇÃO APLICADA AQUI >>>
-            # Seleciona as colunas do df_pedidos para o merge
-            df_pedidos_para_merge = df_pedidos[['document_id', 'status']].copy()
-
-            # Faz o merge, adicionando sufixos para diferenciar as colunas 'status'
-            df_itens_completo = pd.merge(
-                df_itens_pedidos,
-                df_pedidos_para_merge,
-                on='document_id',
-                how='left',
-                suffixes=('_item', '_pedido')  # Adiciona sufixos
-            )
-
-            # Agora, a coluna de status do pedido se chama 'status_pedido'
-            # Filtra os itens com base no status do pedido correspondente
-            df_itens_concluidos = df_itens_completo[df_itens_completo['status_pedido'] == 'PGCON'].copy()
-
+        if not df_rollup_itens.empty:
             col_grafico1, col_grafico2 = st.columns(2)
 
             with col_grafico1:
                 with st.container(border=True, height=500):
                     st.markdown("<h6>Faturamento por Profissional</h6>", unsafe_allow_html=True)
 
-                    df_faturamento_prof = df_itens_concluidos.groupby('alias_name')[
-                        'value_discount'].sum().reset_index()
-                    df_faturamento_prof = df_faturamento_prof.sort_values('value_discount',
-                                                                          ascending=False).reset_index(drop=True)
-                    df_faturamento_prof['texto_valor'] = df_faturamento_prof['value_discount'].apply(
-                        formatar_valor_abreviado)
-
-                    fig_prof = go.Figure(go.Bar(
-                        x=df_faturamento_prof['value_discount'],
-                        y=df_faturamento_prof['alias_name'],
-                        text=df_faturamento_prof['texto_valor'],
-                        textposition='outside', orientation='h', marker_color=cores_payvip["roxo"]
-                    ))
-                    fig_prof.update_layout(
-                        title_text=None, plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-                        yaxis=dict(autorange="reversed"), bargap=0.4,
-                        height=len(df_faturamento_prof) * 35 + 50,
-                        margin=dict(l=150, r=20, t=10, b=20)
-                    )
-                    st.plotly_chart(fig_prof, use_container_width=True)
+                    with medir("grafico", grafico="gestao_faturamento_profissional") as evento:
+                        df_faturamento_prof = faturamento_itens(df_rollup_itens, 'alias_name', data_inicio, data_fim)
+                        fig_prof = figura_barras_horizontais("gestao_faturamento_profissional", df_faturamento_prof,
+                                                             'alias_name', 'value_discount', formatar_valor_abreviado)
+                        st.plotly_chart(fig_prof, use_container_width=True)
+                        evento["barras"] = len(df_faturamento_prof)
 
             with col_grafico2:
                 with st.container(border=True, height=500):
                     st.markdown("<h6>Faturamento por Produto/Serviço</h6>", unsafe_allow_html=True)
 
-                    df_faturamento_prod = df_itens_concluidos.groupby('description')[
-                        'value_discount'].sum().reset_index()
-                    df_faturamento_prod = df_faturamento_prod.sort_values('value_discount',
-                                                                          ascending=False).reset_index(drop=True)
-                    df_faturamento_prod['texto_valor'] = df_faturamento_prod['value_discount'].apply(
-                        formatar_valor_abreviado)
-
-                    fig_prod = go.Figure(go.Bar(
-                        x=df_faturamento_prod['value_discount'],
-                        y=df_faturamento_prod['description'],
-                        text=df_faturamento_prod['texto_valor'],
-                        textposition='outside', orientation='h', marker_color=cores_payvip["roxo"]
-                    ))
-                    fig_prod.update_layout(
-                        title_text=None, plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-                        yaxis=dict(autorange="reversed"), bargap=0.4,
-                        height=len(df_faturamento_prod) * 35 + 50,
-                        margin=dict(l=150, r=20, t=10, b=20)
-                    )
-                    st.plotly_chart(fig_prod, use_container_width=True)
+                    with medir("grafico", grafico="gestao_faturamento_produto") as evento:
+                        df_faturamento_prod = faturamento_itens(df_rollup_itens, 'description', data_inicio, data_fim)
+                        fig_prod = figura_barras_horizontais("gestao_faturamento_produto", df_faturamento_prod,
+                                                             'description', 'value_discount', formatar_valor_abreviado)
+                        st.plotly_chart(fig_prod, use_container_width=True)
+                        evento["barras"] = len(df_faturamento_prod)
 
     else:
         st.warning("Não há dados de pedidos para o período selecionado.")
\ No newline at end of file
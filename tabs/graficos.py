@@ -0,0 +1,158 @@
+# tabs/graficos.py
+
+import hashlib
+
+import pandas as pd
+from functions.cache import CacheLimitado
+from tabs.utils import cores_payvip
+
+# --- CACHE DE FIGURAS ---
+# As figuras são guardadas prontas, pela chave (gráfico, hash dos dados agregados):
+# um rerun que não muda os dados (trocar de página, digitar no filtro, voltar a um
+# período já visto) reaproveita a figura em vez de montá-la de novo no Plotly.
+cache_figuras = CacheLimitado(limite_bytes=32 * 1024 * 1024)
+
+# Tamanho estimado de uma figura no orçamento do cache: o layout (quase fixo) mais
+# os dados, que crescem com o frame de entrada. Serializar a figura para medi-la
+# custaria quase o mesmo que montá-la.
+TAMANHO_BASE_FIGURA = 8 * 1024
+
+# Limites que mantêm o tamanho das figuras enviadas ao navegador sob controle
+MAX_CATEGORIAS_DONUT = 6
+MAX_CATEGORIAS_BARRAS = 15
+MAX_DIAS_DIARIO = 62  # acima disso, o volume de vendas é agrupado por semana
+MAX_DIAS_SEMANAL = 183  # e acima disso, por mês
+ALTURA_BARRA = 35
+ROTULO_OUTROS = "Outros"
+
+GRANULARIDADES = {"D": "Diário", "W": "Semanal", "M": "Mensal"}
+
+
+def _hash_dados(df):
+    conteudo = pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+    return hashlib.sha1("|".join(map(str, df.columns)).encode() + conteudo).hexdigest()
+
+
+def _figura_em_cache(nome, df, montar, *parametros):
+    chave = (nome, _hash_dados(df), parametros)
+    figura = cache_figuras.obter(chave)
+    if figura is None:
+        figura = montar()
+        tamanho = TAMANHO_BASE_FIGURA + 2 * int(df.memory_usage(deep=True, index=False).sum())
+        cache_figuras.guardar(chave, figura, tamanho=tamanho)
+    return figura
+
+
+# --- REDUÇÃO DOS DADOS ---
+
+def top_n_com_outros(df, coluna_rotulo, coluna_valor, n):
+    """As n-1 maiores categorias por valor e as demais somadas em "Outros" (se houver mais de n)."""
+    df = df.sort_values(coluna_valor, ascending=False, ignore_index=True)
+    if len(df) <= n:
+        return df
+    outros = pd.DataFrame({coluna_rotulo: [ROTULO_OUTROS], coluna_valor: [df[coluna_valor].iloc[n - 1:].sum()]})
+    return pd.concat([df[[coluna_rotulo, coluna_valor]].iloc[:n - 1].astype({coluna_rotulo: object}), outros],
+                     ignore_index=True)
+
+
+def granularidade_do_periodo(data_inicio, data_fim):
+    """'D' (diário), 'W' (semanal) ou 'M' (mensal), conforme o tamanho do período."""
+    dias = (data_fim - data_inicio).days + 1
+    if dias <= MAX_DIAS_DIARIO:
+        return "D"
+    return "W" if dias <= MAX_DIAS_SEMANAL else "M"
+
+
+def agrupar_por_periodo(df_diario, granularidade):
+    """Soma o volume diário (colunas data, valor) por semana ou mês; cada grupo leva a data em que começa."""
+    if granularidade == "D":
+        return df_diario
+    inicio_grupo = pd.to_datetime(df_diario['data']).dt.to_period(granularidade).dt.start_time.dt.date
+    # O primeiro grupo começa no início do período, e não antes dele
+    inicio_grupo = inicio_grupo.clip(lower=df_diario['data'].iloc[0])
+    return df_diario.groupby(inicio_grupo.rename('data'))['valor'].sum().reset_index()
+
+
+# --- FIGURAS ---
+# O Plotly é importado dentro das funções que montam as figuras: ele só é carregado
+# quando a primeira figura é de fato montada, e não ao importar as abas.
+
+def _layout_donut(figura):
+    figura.update_traces(textinfo='percent', textfont_size=14)
+    figura.update_layout(showlegend=True,
+                         legend=dict(orientation="h", yanchor="bottom", y=-0.4, xanchor="center", x=0.5),
+                         margin=dict(t=20, b=20, l=20, r=20), height=300)
+    return figura
+
+
+def figura_vendas_por_metodo(df_metodo):
+    """Donut de valor por método (colunas metodo_simplificado, amount)."""
+    df = top_n_com_outros(df_metodo, 'metodo_simplificado', 'amount', MAX_CATEGORIAS_DONUT)
+
+    def montar():
+        import plotly.express as px
+        return _layout_donut(px.pie(
+            df, values='amount', names='metodo_simplificado', hole=0.6,
+            color_discrete_sequence=[cores_payvip["roxo"], cores_payvip["laranja"], cores_payvip["cinza"],
+                                     "#AAB2BD", "#C5CDE0"]))
+
+    return _figura_em_cache("vendas_por_metodo", df, montar)
+
+
+def figura_status_transacoes(df_status):
+    """Donut de valor por status das transações (colunas status, amount)."""
+    df = top_n_com_outros(df_status, 'status', 'amount', MAX_CATEGORIAS_DONUT)
+    mapa_cores = {'Aprovada': cores_payvip["roxo"], 'Cancelada': cores_payvip["laranja"],
+                  'Estornada': cores_payvip["cinza"], 'Chargeback': '#B22222', ROTULO_OUTROS: '#C5CDE0'}
+
+    def montar():
+        import plotly.express as px
+        return _layout_donut(px.pie(df, values='amount', names='status', hole=0.6, color='status',
+                                    color_discrete_map=mapa_cores))
+
+    return _figura_em_cache("status_transacoes", df, montar)
+
+
+def figura_volume_vendas(df_diario, granularidade):
+    """Barras do volume aprovado por dia, semana ou mês (colunas data, valor); largura cresce com as barras."""
+    df = agrupar_por_periodo(df_diario, granularidade)
+
+    def montar():
+        import plotly.graph_objects as go
+        eixo_x = dict(showline=False, tickformat="%d/%m", tickmode='linear', tickangle=-45)
+        if granularidade == "W":
+            eixo_x.update(dtick=7 * 24 * 60 * 60 * 1000, tick0=df['data'].iloc[0])
+        elif granularidade == "M":
+            eixo_x.update(dtick="M1", tickformat="%m/%Y", tick0=df['data'].iloc[0])
+        figura = go.Figure(go.Bar(x=df['data'], y=df['valor'], marker_color=cores_payvip["roxo"]))
+        figura.update_layout(title_text=None, plot_bgcolor='rgba(0,0,0,0)',
+                             yaxis=dict(showgrid=False, visible=False), bargap=0.4,
+                             margin=dict(t=10, b=0, l=0, r=0), height=250, width=max(600, len(df) * 35),
+                             xaxis=eixo_x)
+        return figura
+
+    return _figura_em_cache("volume_vendas", df, montar, granularidade)
+
+
+def figura_barras_horizontais(nome, df_valores, coluna_rotulo, coluna_valor, formatar_valor):
+    """Barras horizontais ordenadas por valor, limitadas às maiores categorias mais "Outros"."""
+    df = top_n_com_outros(df_valores, coluna_rotulo, coluna_valor, MAX_CATEGORIAS_BARRAS)
+
+    def montar():
+        import plotly.graph_objects as go
+        figura = go.Figure(go.Bar(
+            x=df[coluna_valor],
+            y=df[coluna_rotulo],
+            text=df[coluna_valor].map(formatar_valor),
+            textposition='outside', orientation='h', marker_color=cores_payvip["roxo"]
+        ))
+        figura.update_layout(
+            title_text=None, plot_bgcolor='rgba(0,0,0,0)',
+            xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
+            yaxis=dict(autorange="reversed"), bargap=0.4,
+            height=len(df) * ALTURA_BARRA + 50,
+            margin=dict(l=150, r=20, t=10, b=20)
+        )
+        return figura
+
+    return _figura_em_cache(nome, df, montar)
@@ -1,10 +1,8 @@
 # tabs/kpi.py
 
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import calendar
-from functions.fc_dash_vendas import dados_kpi
+from functions.fc_dash_vendas import dados_painel_kpi
 
 # <<< MUDANÇA: DICIONÁRIO COM OS TEXTOS DOS TOOLTIPS >>>
 # Centraliza todos os textos explicativos em um único lugar para fácil manutenção.
@@ -40,77 +38,46 @@ def render(people_id, gmv_metas, tpv_metas):
         st.warning("Nenhuma meta de KPI encontrada para este usuário.")
         return
 
+    # O mês inicial (o atual, se tiver meta) vai para o session_state, e não em index=:
+    # o dashboard preserva esse valor entre as abas
     mes_atual_str = datetime.now().strftime("%m/%Y")
-    try:
-        default_index = lista_meses_meta.index(mes_atual_str)
-    except ValueError:
-        default_index = 0
+    if st.session_state.get("kpi_mes_meta") not in lista_meses_meta:
+        st.session_state["kpi_mes_meta"] = mes_atual_str if mes_atual_str in lista_meses_meta else lista_meses_meta[0]
 
-    mes_selecionado_kpi = st.selectbox("Selecione o Mês da Meta", options=lista_meses_meta, index=default_index)
+    mes_selecionado_kpi = st.selectbox("Selecione o Mês da Meta", options=lista_meses_meta, key="kpi_mes_meta")
 
-    ano_kpi = int(mes_selecionado_kpi.split('/')[1])
+    mes_num, ano_kpi = map(int, mes_selecionado_kpi.split('/'))
     try:
         with st.spinner(f"Buscando dados de KPI para o ano de {ano_kpi}..."):
-            df_pedidos_kpi_ano, df_transacoes_kpi_ano = dados_kpi(people_id=people_id, year_date=str(ano_kpi))
+            # Indicadores de todos os meses do ano, calculados uma vez e guardados em cache
+            painel = dados_painel_kpi(people_id, ano_kpi, gmv_metas, tpv_metas)
     except Exception as e:
         st.error(f"Ocorreu um erro ao buscar os dados de KPI: {e}")
         return
 
-    if df_pedidos_kpi_ano is not None and not df_pedidos_kpi_ano.empty and df_transacoes_kpi_ano is not None and not df_transacoes_kpi_ano.empty:
-        df_pedidos_kpi_ano.columns = df_pedidos_kpi_ano.columns.str.strip().str.lower()
-        df_pedidos_kpi_ano['total_amount'] = pd.to_numeric(df_pedidos_kpi_ano['total_amount'], errors='coerce').fillna(
-            0)
-        df_pedidos_kpi_ano['created_at_gmt_minus_3'] = pd.to_datetime(df_pedidos_kpi_ano['created_at_gmt_minus_3'],
-                                                                      errors='coerce').dt.tz_localize(None)
-
-        df_transacoes_kpi_ano.columns = df_transacoes_kpi_ano.columns.str.strip().str.lower()
-        df_transacoes_kpi_ano['amount'] = pd.to_numeric(df_transacoes_kpi_ano['amount'], errors='coerce').fillna(0)
-        df_transacoes_kpi_ano['created_at_gmt_minus_3'] = pd.to_datetime(
-            df_transacoes_kpi_ano['created_at_gmt_minus_3'], errors='coerce').dt.tz_localize(None)
-
-        mes_num, ano_num = map(int, mes_selecionado_kpi.split('/'))
-        start_date_mes = datetime(ano_num, mes_num, 1)
-        end_date_mes = start_date_mes.replace(day=calendar.monthrange(ano_num, mes_num)[1])
-        start_date_acumulado = datetime(ano_num, 1, 1)
-        end_date_acumulado = end_date_mes
-
-        df_pedidos_mes = df_pedidos_kpi_ano[df_pedidos_kpi_ano['created_at_gmt_minus_3'].between(start_date_mes,
-                                                                                                 end_date_mes.replace(
-                                                                                                     hour=23, minute=59,
-                                                                                                     second=59))]
-        df_pedidos_acumulado = df_pedidos_kpi_ano[
-            df_pedidos_kpi_ano['created_at_gmt_minus_3'].between(start_date_acumulado,
-                                                                 end_date_acumulado.replace(hour=23, minute=59,
-                                                                                            second=59))]
-        df_transacoes_mes = df_transacoes_kpi_ano[
-            df_transacoes_kpi_ano['created_at_gmt_minus_3'].between(start_date_mes,
-                                                                    end_date_mes.replace(hour=23, minute=59,
-                                                                                         second=59))]
-        df_transacoes_acumulado = df_transacoes_kpi_ano[
-            df_transacoes_kpi_ano['created_at_gmt_minus_3'].between(start_date_acumulado,
-                                                                    end_date_acumulado.replace(hour=23, minute=59,
-                                                                                               second=59))]
+    if painel:
+        indicadores = painel[mes_num]
 
         def formatar_moeda(valor):
             return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-        total_pedidos_acumulado = len(df_pedidos_acumulado)
-        gmv_meta_acumulada = sum(v for k, v in gmv_metas.items() if datetime.strptime(k, "%m/%Y") <= end_date_mes)
-        gmv_real_acumulado = df_pedidos_acumulado['total_amount'].sum()
-        aderencia_gmv_acumulada = (gmv_real_acumulado / gmv_meta_acumulada * 100) if gmv_meta_acumulada > 0 else 0
-        total_pedidos_mes = len(df_pedidos_mes)
-        gmv_meta_mes = gmv_metas.get(mes_selecionado_kpi, 0)
-        gmv_real_mes = df_pedidos_mes['total_amount'].sum()
-        aderencia_gmv_mes = (gmv_real_mes / gmv_meta_mes * 100) if gmv_meta_mes > 0 else 0
-
-        qtd_transacoes_acumulado = len(df_transacoes_acumulado)
-        tpv_meta_acumulada = sum(v for k, v in tpv_metas.items() if datetime.strptime(k, "%m/%Y") <= end_date_mes)
-        tpv_real_acumulado = df_transacoes_acumulado['amount'].sum()
-        aderencia_tpv_acumulada = (tpv_real_acumulado / tpv_meta_acumulada * 100) if tpv_meta_acumulada > 0 else 0
-        qtd_transacoes_mes = len(df_transacoes_mes)
-        tpv_meta_mes = tpv_metas.get(mes_selecionado_kpi, 0)
-        tpv_real_mes = df_transacoes_mes['amount'].sum()
-        aderencia_tpv_mes = (tpv_real_mes / tpv_meta_mes * 100) if tpv_meta_mes > 0 else 0
+        total_pedidos_acumulado = indicadores["total_pedidos_acumulado"]
+        gmv_meta_acumulada = indicadores["gmv_meta_acumulada"]
+        gmv_real_acumulado = indicadores["gmv_real_acumulado"]
+        aderencia_gmv_acumulada = indicadores["aderencia_gmv_acumulada"]
+        total_pedidos_mes = indicadores["total_pedidos_mes"]
+        gmv_meta_mes = indicadores["gmv_meta_mes"]
+        gmv_real_mes = indicadores["gmv_real_mes"]
+        aderencia_gmv_mes = indicadores["aderencia_gmv_mes"]
+
+        qtd_transacoes_acumulado = indicadores["qtd_transacoes_acumulado"]
+        tpv_meta_acumulada = indicadores["tpv_meta_acumulada"]
+        tpv_real_acumulado = indicadores["tpv_real_acumulado"]
+        aderencia_tpv_acumulada = indicadores["aderencia_tpv_acumulada"]
+        qtd_transacoes_mes = indicadores["qtd_transacoes_mes"]
+        tpv_meta_mes = indicadores["tpv_meta_mes"]
+        tpv_real_mes = indicadores["tpv_real_mes"]
+        aderencia_tpv_mes = indicadores["aderencia_tpv_mes"]
 
         st.markdown("<h6>GMV Acumulado no Ano</h6>", unsafe_allow_html=True)
         kpi_cols1 = st.columns(4)
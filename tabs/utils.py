@@ -1,47 +1,80 @@
 # tabs/utils.py
 
+import numpy as np
 import pandas as pd
 
 # Paleta de cores compartilhada
 cores_payvip = {"roxo": "#4A3A75", "laranja": "#DB563F", "cinza": "#878787"}
 
 
-# Função de grid HTML compartilhada
-def gerar_grid_html(df_para_mostrar):
-    html_parts = [
-        '<div class="grid-container">',
-        '<div class="grid-row grid-header-row"><div>Data</div><div>ID da Transação</div><div>Cliente</div><div>Tipo</div><div class="valor">Valor</div></div>'
-    ]
-    for _, row in df_para_mostrar.iterrows():
-        try:
-            data_obj = pd.to_datetime(row.get('created_at_gmt_minus_3', ''))
-            data_str = data_obj.strftime('%d/%m/%Y')
-            hora_str = data_obj.strftime('%H:%M:%S')
-        except (ValueError, TypeError):
-            data_str, hora_str = "Data inválida", ""
-
-        id_str = str(row.get('transaction_id', 'N/A'))
-        status_str = str(row.get('status', 'N/A'))
-        status_class = f"status-{status_str.replace(' ', '')}"
-
-        cliente_nome = str(row.get('product_name', '')).strip().upper()
-        if not cliente_nome or cliente_nome == 'NONE':
-            cliente_nome = 'VENDA SEM PEDIDO'
-
-        cliente_doc = str(row.get('customer_document', ''))
-        tipo_str = str(row.get('product_capture', 'N/A'))
-        valor_str = f"R$ {row.get('amount', 0):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-        row_html = f"""
+# Troca os separadores do formato americano (1,234.56) pelo brasileiro (1.234,56)
+_SEPARADORES_BR = str.maketrans(",.", ".,")
+
+_CABECALHO_GRID = (
+    '<div class="grid-container">'
+    '<div class="grid-row grid-header-row"><div>Data</div><div>ID da Transação</div><div>Cliente</div><div>Tipo</div><div class="valor">Valor</div></div>'
+)
+# Mesmo texto (inclusive quebras de linha e recuos) da versão que montava linha a linha
+_MODELO_LINHA_GRID = """
             <div class="grid-row">
-                <div class="grid-col"><div>{data_str}</div><div style="font-size:0.8rem; color:#878787;">{hora_str}</div></div>
-                <div class="grid-col" style="font-family: monospace; font-size: 0.8rem; word-break: break-all;">{id_str}</div>
-                <div class="grid-col"><div class="status-text {status_class}">{status_str.upper()}</div><div class="client-name">{cliente_nome}</div><div class="client-cnpj">{cliente_doc}</div></div>
-                <div class="grid-col"><div>{tipo_str}</div></div>
-                <div class="grid-col valor">{valor_str}</div>
+                <div class="grid-col"><div>{}</div><div style="font-size:0.8rem; color:#878787;">{}</div></div>
+                <div class="grid-col" style="font-family: monospace; font-size: 0.8rem; word-break: break-all;">{}</div>
+                <div class="grid-col"><div class="status-text status-{}">{}</div><div class="client-name">{}</div><div class="client-cnpj">{}</div></div>
+                <div class="grid-col"><div>{}</div></div>
+                <div class="grid-col valor">R$ {}</div>
             </div>
         """
-        html_parts.append(row_html)
 
-    html_parts.append('</div>')
-    return "".join(html_parts)
\ No newline at end of file
+
+def _coluna_texto(df, coluna, padrao):
+    """Coluna como lista de textos, com `padrao` para linhas nulas ou coluna ausente."""
+    if coluna not in df.columns:
+        return [padrao] * len(df)
+    serie = df[coluna]
+    return [padrao if nulo else str(valor) for valor, nulo in zip(serie.tolist(), serie.isna().tolist())]
+
+
+def _formatar_datas(df):
+    """Datas e horas da coluna created_at_gmt_minus_3 já formatadas (dd/mm/aaaa, hh:mm:ss)."""
+    if 'created_at_gmt_minus_3' not in df.columns:
+        return ["Data inválida"] * len(df), [""] * len(df)
+    datas = df['created_at_gmt_minus_3']
+    if not pd.api.types.is_datetime64_any_dtype(datas):
+        datas = pd.to_datetime(datas, errors='coerce')
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    # datetime_as_string (ISO) converte a coluna inteira de uma vez e é bem mais
+    # rápido que dt.strftime; depois só recortamos as partes de cada texto.
+    iso = np.datetime_as_string(datas.to_numpy(dtype='datetime64[s]'), unit='s').tolist()
+    data_str = [f"{d[8:10]}/{d[5:7]}/{d[0:4]}" if d != 'NaT' else "Data inválida" for d in iso]
+    hora_str = [d[11:19] if d != 'NaT' else "" for d in iso]
+    return data_str, hora_str
+
+
+# Função de grid HTML compartilhada. Cada campo é preparado para a coluna inteira
+# e as linhas são montadas num único join, sem iterrows nem conversões por linha.
+def gerar_grid_html(df_para_mostrar):
+    df = df_para_mostrar
+    if df.empty:
+        return _CABECALHO_GRID + '</div>'
+
+    data_str, hora_str = _formatar_datas(df)
+    id_str = _coluna_texto(df, 'transaction_id', 'N/A')
+    status_str = _coluna_texto(df, 'status', 'N/A')
+    status_class = [status.replace(' ', '') for status in status_str]
+    status_upper = [status.upper() for status in status_str]
+
+    cliente_nome = [nome.strip().upper() for nome in _coluna_texto(df, 'product_name', '')]
+    cliente_nome = [nome if nome and nome != 'NONE' else 'VENDA SEM PEDIDO' for nome in cliente_nome]
+
+    cliente_doc = _coluna_texto(df, 'customer_document', '')
+    tipo_str = _coluna_texto(df, 'product_capture', 'N/A')
+    if 'amount' in df.columns:
+        valores = pd.to_numeric(df['amount'], errors='coerce').fillna(0).tolist()
+    else:
+        valores = [0.0] * len(df)
+    valor_str = [f"{valor:,.2f}".translate(_SEPARADORES_BR) for valor in valores]
+
+    linhas = map(_MODELO_LINHA_GRID.format, data_str, hora_str, id_str, status_class, status_upper,
+                 cliente_nome, cliente_doc, tipo_str, valor_str)
+    return _CABECALHO_GRID + "".join(linhas) + '</div>'